@@ -3,18 +3,48 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from backend.database import get_db
+from backend.database import SessionLocal, db_slots, get_db
 from backend.models import User
-from backend.schemas import TokenData
+from backend.schemas import TokenData, Principal
+from backend.cache import TTLCache
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import time
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated users are cached by token subject so most requests skip the
+# users lookup. Entries are dropped when the user is updated.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+# Embed id/role/is_active in access tokens and trust them on a cache miss.
+# Updates to a user only revoke those claims on the worker that made the update,
+# so other workers trust them until the token expires.
+AUTH_TOKEN_CLAIMS = os.getenv("AUTH_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+# bcrypt cost factor. Stored hashes with a different cost are rehashed on the
+# next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs in a process pool so it neither blocks the event loop nor holds
+# the GIL. 0 workers hashes inline in the calling thread.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Hash jobs allowed to queue up before new logins are turned away with a 503.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password, hashed_password):
@@ -23,6 +53,44 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=True)
+            _hash_pool = None
+
+def run_password_job(func, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        if PASSWORD_HASH_WORKERS <= 0:
+            return func(*args)
+        return _get_hash_pool().submit(func, *args).result()
+    finally:
+        _hash_slots.release()
+
 def get_user(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
@@ -30,21 +98,56 @@ def authenticate_user(db: Session, email: str, password: str):
     user = get_user(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = run_password_job(verify_and_update_password, password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
+def token_claims(user: User):
+    claims = {"sub": user.email}
+    if AUTH_TOKEN_CLAIMS:
+        claims.update({"uid": user.id, "role": user.role.value, "active": user.is_active})
+    return claims
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=15)
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+principal_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+_invalidated_at = {}
+_claims_hits = 0
+_claims_lock = threading.Lock()
+
+def invalidate_principal(email: str):
+    principal_cache.pop(email)
+    _invalidated_at[email] = time.time()
+
+def principal_cache_stats():
+    stats = principal_cache.stats()
+    stats["claims_hits"] = _claims_hits
+    return stats
+
+def _principal_from_claims(payload: dict):
+    global _claims_hits
+    if not AUTH_TOKEN_CLAIMS or "uid" not in payload:
+        return None
+    if payload.get("iat", 0) <= _invalidated_at.get(payload["sub"], 0):
+        return None
+    with _claims_lock:
+        _claims_hits += 1
+    return Principal(id=payload["uid"], email=payload["sub"], role=payload["role"], is_active=payload["active"])
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -58,12 +161,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = get_user(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-    return user
+    principal = principal_cache.get(token_data.email) or _principal_from_claims(payload)
+    if principal is None:
+        user = get_user(db, email=token_data.email)
+        if user is None:
+            raise credentials_exception
+        principal = Principal.model_validate(user)
+        principal_cache.set(token_data.email, principal)
+    return principal
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+def _principal_for_token(token: str):
+    db = SessionLocal()
+    try:
+        return get_current_user(token, db)
+    finally:
+        db.close()
+
+async def get_stream_user(token: str = Depends(oauth2_scheme)):
+    # For long-lived streams: the user is resolved on a session that is closed
+    # before the response starts, instead of a get_db session that would keep
+    # its slot and pooled connection until the stream ends.
+    async with db_slots:
+        current_user = await run_in_threadpool(_principal_for_token, token)
+    return await get_current_active_user(current_user)
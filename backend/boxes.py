@@ -0,0 +1,122 @@
+from datetime import timedelta
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from backend import ledger, models
+from backend.changes import mark_changed
+
+# Weekly requirement statuses that mean the agency's families get a box.
+BOXED_REQUIREMENT_STATUSES = ("confirmed", "packed", "collected")
+
+def box_number(number: int):
+    # At least four digits; longer past 9999, so order by length first (see
+    # manifest_query) to keep numeric order.
+    return f"{number:04d}"
+
+def _claim_sequence(db: Session, session_id: int):
+    # Creates the session's sequence row on first use, starting after any
+    # boxes already in the session, and locks it until commit with a no-op
+    # UPDATE. Concurrent batch runs for one session queue up here instead of
+    # boxing the same families twice.
+    table = models.BoxNumberSequence.__table__
+    lock = (
+        update(table)
+        .where(table.c.packing_session_id == session_id)
+        .values(last_number=table.c.last_number)
+        .returning(table.c.last_number)
+    )
+    if db.connection().execute(lock).scalar() is not None:
+        return
+    existing = db.execute(
+        select(func.count()).select_from(models.FoodBox).where(models.FoodBox.packing_session_id == session_id)
+    ).scalar()
+    try:
+        with db.begin_nested():
+            db.connection().execute(insert(table).values(packing_session_id=session_id, last_number=existing))
+    except IntegrityError:
+        # Created by a concurrent request; wait for its lock.
+        db.connection().execute(lock)
+
+def reserve_box_numbers(db: Session, session_id: int, count: int):
+    # The first of count consecutive numbers, taken with a single increment.
+    table = models.BoxNumberSequence.__table__
+    last = db.connection().execute(
+        update(table)
+        .where(table.c.packing_session_id == session_id)
+        .values(last_number=table.c.last_number + count)
+        .returning(table.c.last_number)
+    ).scalar()
+    return last - count + 1
+
+def session_agencies(db: Session, session: models.PackingSession):
+    # Active agencies with a confirmed (or later) requirement for the week of
+    # the session's packing list.
+    packing_list = db.get(models.PackingList, session.packing_list_id)
+    requirement = models.WeeklyRequirement
+    return db.execute(
+        select(models.Agency.id)
+        .where(
+            models.Agency.is_active.is_(True),
+            models.Agency.id.in_(
+                select(requirement.agency_id).where(
+                    requirement.week_start >= packing_list.week_start,
+                    requirement.week_start < packing_list.week_end + timedelta(days=1),
+                    requirement.status.in_(BOXED_REQUIREMENT_STATUSES),
+                )
+            ),
+        )
+        .order_by(models.Agency.id)
+    ).scalars().all()
+
+def create_session_boxes(db: Session, session: models.PackingSession, agency_ids=None):
+    # One box for every family of the agencies (active and temporary; not
+    # inactive) that has none in the session yet, numbered in agency and
+    # family name order. The boxes are inserted in one statement and
+    # consumed from stock by the ledger in the same transaction; the caller
+    # commits. Returns the new box ids.
+    if agency_ids is None:
+        agency_ids = session_agencies(db, session)
+    if not agency_ids:
+        return []
+    _claim_sequence(db, session.id)
+    boxed = select(models.FoodBox.family_id).where(models.FoodBox.packing_session_id == session.id)
+    family_ids = db.execute(
+        select(models.Family.id)
+        .where(
+            models.Family.agency_id.in_(sorted(set(agency_ids))),
+            models.Family.status != models.FamilyStatus.INACTIVE,
+            models.Family.id.not_in(boxed),
+        )
+        .order_by(models.Family.agency_id, models.Family.family_name, models.Family.id)
+    ).scalars().all()
+    if not family_ids:
+        return []
+
+    first = reserve_box_numbers(db, session.id, len(family_ids))
+    food_box_ids = db.execute(
+        insert(models.FoodBox).returning(models.FoodBox.id, sort_by_parameter_order=True),
+        [
+            {"family_id": family_id, "packing_session_id": session.id, "box_number": box_number(first + offset)}
+            for offset, family_id in enumerate(family_ids)
+        ],
+    ).scalars().all()
+    mark_changed(db, models.FoodBox.__tablename__, models.BoxNumberSequence.__tablename__)
+    ledger.boxes_packed(db, food_box_ids)
+    return food_box_ids
+
+def manifest_query(session_id: int):
+    # Every box in the session with its family and agency, in box number order
+    # (shorter numbers first, so "9999" precedes "10000"), for printing labels
+    # and the collection sheet.
+    box, family, agency = models.FoodBox, models.Family, models.Agency
+    return (
+        select(
+            box.box_number, agency.name.label("agency"), family.id.label("family_id"), family.family_name,
+            family.contact_person, family.phone, family.address, family.family_size,
+            family.special_requirements, box.status,
+        )
+        .join(family, family.id == box.family_id)
+        .join(agency, agency.id == family.agency_id)
+        .where(box.packing_session_id == session_id)
+        .order_by(func.length(box.box_number), box.box_number, box.id)
+    )
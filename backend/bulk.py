@@ -0,0 +1,169 @@
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from backend.changes import mark_changed
+import json
+import os
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+
+class InvalidRow:
+    def __init__(self, error: str):
+        self.error = error
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return InvalidRow(f"Invalid JSON: {exc}")
+
+async def read_rows(request: Request):
+    # Accepts either a JSON array or newline-delimited JSON (one object per
+    # line). NDJSON is parsed as it streams in.
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = []
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            rows.extend(_parse_line(line) for line in lines if line.strip())
+            if len(rows) > BULK_MAX_ROWS:
+                break
+        if buffer.strip():
+            rows.append(_parse_line(buffer))
+    else:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per request")
+    return rows
+
+def _error_message(exc: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+def validate_rows(model, create_schema, update_schema, rows):
+    # Rows carrying an "id" update that record, the rest are inserts. Only keys
+    # that map to table columns are kept.
+    columns = set(model.__table__.columns.keys())
+    creates, updates, errors = [], [], {}
+    for index, row in enumerate(rows):
+        if isinstance(row, InvalidRow):
+            errors[index] = row.error
+            continue
+        if not isinstance(row, dict):
+            errors[index] = "Row must be a JSON object"
+            continue
+        try:
+            if "id" in row:
+                values = update_schema(**row).dict(exclude_unset=True)
+                values = {key: value for key, value in values.items() if key in columns}
+                values["id"] = int(row["id"])
+                updates.append((index, values))
+            else:
+                values = create_schema(**row).dict()
+                creates.append((index, {key: value for key, value in values.items() if key in columns}))
+        except ValidationError as exc:
+            errors[index] = _error_message(exc)
+        except (TypeError, ValueError) as exc:
+            errors[index] = str(exc)
+    return creates, updates, errors
+
+def _chunks(entries, size):
+    for start in range(0, len(entries), size):
+        yield entries[start:start + size]
+
+def _insert_chunk(db: Session, model, chunk, returning: bool = True):
+    values = [values for _, values in chunk]
+    if not returning:
+        # Plain executemany on the session's connection skips RETURNING and
+        # the ORM bulk path when the caller has no use for the new ids.
+        db.connection().execute(insert(model.__table__), values)
+        return [None] * len(values)
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.execute(statement, values).scalars())
+
+def _run_chunk(db: Session, chunk, write_chunk, write_row, results, errors):
+    # Each chunk runs in a savepoint. If the database rejects it, the chunk is
+    # replayed row by row so only the offending rows are reported as failed.
+    try:
+        with db.begin_nested():
+            for (index, _), row_id in zip(chunk, write_chunk(chunk)):
+                results[index] = row_id
+    except DBAPIError:
+        for index, values in chunk:
+            try:
+                with db.begin_nested():
+                    results[index] = write_row(index, values)
+            except DBAPIError as exc:
+                errors[index] = str(exc.orig)
+
+def insert_rows(db: Session, model, entries, created, errors, chunk_size: int = None, returning: bool = True):
+    # entries are (key, values) pairs; new ids land in created[key] (None
+    # without returning) and rows the database rejects in errors[key].
+    for chunk in _chunks(entries, chunk_size or BULK_CHUNK_SIZE):
+        _run_chunk(
+            db, chunk,
+            lambda chunk: _insert_chunk(db, model, chunk, returning),
+            lambda key, values: _insert_chunk(db, model, [(key, values)], returning)[0],
+            created, errors,
+        )
+
+def apply(db: Session, model, create_schema, update_schema, rows, chunk_size: int = None, after_write=None):
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    creates, updates, errors = validate_rows(model, create_schema, update_schema, rows)
+
+    created, updated = {}, {}
+    insert_rows(db, model, creates, created, errors, chunk_size)
+
+    # Checked after the inserts so a request may update rows it just created.
+    if updates:
+        requested = [values["id"] for _, values in updates]
+        existing = set()
+        for ids in _chunks(requested, chunk_size):
+            existing.update(db.execute(select(model.id).where(model.id.in_(ids))).scalars())
+        for index, values in updates:
+            if values["id"] not in existing:
+                errors[index] = "Not found"
+        updates = [(index, values) for index, values in updates if values["id"] in existing]
+
+    def update_chunk(chunk):
+        # Group by column set so every executemany batch has the same shape.
+        by_shape = {}
+        for _, values in chunk:
+            by_shape.setdefault(tuple(sorted(values)), []).append(values)
+        for batch in by_shape.values():
+            db.execute(update(model), batch)
+        return [values["id"] for _, values in chunk]
+
+    for chunk in _chunks(updates, chunk_size):
+        _run_chunk(
+            db, chunk, update_chunk,
+            lambda index, values: update_chunk([(index, values)])[0],
+            updated, errors,
+        )
+
+    # Lets the caller maintain derived data in the same transaction.
+    if after_write is not None:
+        after_write(db, [row_id for row_id in created.values() if row_id is not None], list(updated.values()))
+    mark_changed(db, model.__tablename__)
+    db.commit()
+
+    results = []
+    for index in range(len(rows)):
+        if index in errors:
+            results.append({"index": index, "error": errors[index]})
+        elif index in created:
+            results.append({"index": index, "id": created[index], "action": "created"})
+        else:
+            results.append({"index": index, "id": updated[index], "action": "updated"})
+    return {"created": len(created), "updated": len(updated), "failed": len(errors), "results": results}
@@ -0,0 +1,73 @@
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from backend.models import TableVersion
+import threading
+
+# In-process version counter per table, bumped after every commit that wrote to
+# it. Caches key their entries on these versions so a write invalidates them.
+_versions = {}
+_lock = threading.Lock()
+
+# Tables whose version is also stored in the table_versions table. Those
+# numbers are shared by all worker processes, which HTTP validators need; the
+# in-process counters above only suit caches that expire on their own.
+# A migration seeds each table's row, so bumps never race to insert it.
+PERSISTED_TABLES = {
+    "items", "agencies", "rotas",
+    # Forecast history (backend.forecast).
+    "packing_lists", "packing_list_items", "weekly_requirements",
+    # Dashboard summary (backend.dashboard).
+    "families", "item_stock_levels", "packing_sessions", "food_boxes", "orders", "users",
+}
+
+def table_versions(*tables: str):
+    with _lock:
+        return tuple(_versions.get(table, 0) for table in tables)
+
+def persisted_versions(session: Session, *tables: str):
+    # {table: (version, updated_at)} for the tables that have been written to.
+    rows = session.execute(
+        select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.table_name.in_(tables))
+    )
+    return {name: (version, updated_at) for name, version, updated_at in rows}
+
+def _bump_persisted(session: Session, tables):
+    now = datetime.utcnow()
+    connection = session.connection()
+    for table in sorted(tables):
+        result = connection.execute(
+            update(TableVersion.__table__)
+            .where(TableVersion.table_name == table)
+            .values(version=TableVersion.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(TableVersion.__table__).values(table_name=table, version=1, updated_at=now))
+
+def mark_changed(session: Session, *tables: str):
+    # ORM flushes are tracked automatically; Core insert/update statements
+    # executed through the session have to be reported here.
+    session.info.setdefault("changed_tables", set()).update(tables)
+    persisted = PERSISTED_TABLES.intersection(tables)
+    if persisted:
+        _bump_persisted(session, persisted)
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = {obj.__table__.name for obj in chain(session.new, session.dirty, session.deleted)}
+    if tables:
+        mark_changed(session, *tables)
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session):
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        with _lock:
+            for table in tables:
+                _versions[table] = _versions.get(table, 0) + 1
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("changed_tables", None)
@@ -0,0 +1,31 @@
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+import os
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional: pip install brotli-asgi
+    BrotliMiddleware = None
+
+# Bodies smaller than this are sent as is: below about a kilobyte the headers
+# and CPU cost outweigh the bytes saved.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Event streams must reach the client as each event is written, not when a
+# compressor's buffer fills. GZipMiddleware skips text/event-stream by itself.
+UNCOMPRESSED_PATHS = [r"/events$"]
+
+def add_compression(app: FastAPI):
+    # Brotli for clients that accept it when brotli-asgi is installed (it falls
+    # back to gzip for the rest), otherwise gzip only.
+    if BrotliMiddleware is not None:
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=BROTLI_QUALITY,
+            minimum_size=COMPRESSION_MIN_SIZE,
+            gzip_fallback=True,
+            excluded_handlers=UNCOMPRESSED_PATHS,
+        )
+    else:
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=GZIP_LEVEL)
@@ -0,0 +1,91 @@
+from datetime import datetime, time, timedelta
+from itertools import combinations
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from backend import models
+
+def _day(value: datetime):
+    start = datetime.combine(value.date(), time.min)
+    return start, start + timedelta(days=1)
+
+def rota_conflict(db: Session, user_id: int, week_start: datetime, week_end: datetime, exclude_id: int = None):
+    # The first of the user's rota assignments overlapping [week_start, week_end].
+    # Seeks the (user_id, week_end, week_start) index to the first assignment
+    # ending on or after week_start, so earlier assignments are never read;
+    # later ones are filtered on week_start from the index alone, since older
+    # data may hold overlapping assignments.
+    assignment = models.RotaAssignment
+    query = (
+        select(assignment)
+        .where(
+            assignment.user_id == user_id,
+            assignment.week_end >= week_start,
+            assignment.week_start <= week_end,
+        )
+        .order_by(assignment.week_end)
+        .limit(1)
+    )
+    if exclude_id is not None:
+        query = query.where(assignment.id != exclude_id)
+    return db.execute(query).scalars().first()
+
+def session_conflict(db: Session, user_id: int, scheduled_date: datetime, exclude_id: int = None):
+    # The user's volunteer assignment to a packing session on the same day.
+    # Written as IN (sessions that day) so SQLite seeks the scheduled_date index
+    # and then (packing_session_id, user_id), rather than walking every
+    # assignment of the user.
+    assignment, session = models.VolunteerAssignment, models.PackingSession
+    start, end = _day(scheduled_date)
+    sessions_that_day = select(session.id).where(session.scheduled_date >= start, session.scheduled_date < end)
+    query = (
+        select(assignment)
+        .where(assignment.user_id == user_id, assignment.packing_session_id.in_(sessions_that_day))
+        .limit(1)
+    )
+    if exclude_id is not None:
+        query = query.where(assignment.id != exclude_id)
+    return db.execute(query).scalars().first()
+
+def user_conflicts(db: Session, user_id: int):
+    # Every overlapping pair among the user's existing assignments: a sort and
+    # sweep over the rota weeks, and a grouping of packing sessions by day.
+    conflicts = []
+
+    rota_rows = db.execute(
+        select(models.RotaAssignment.id, models.RotaAssignment.week_start, models.RotaAssignment.week_end)
+        .where(models.RotaAssignment.user_id == user_id)
+        .order_by(models.RotaAssignment.week_start, models.RotaAssignment.id)
+    ).all()
+    active = []
+    for assignment_id, start, end in rota_rows:
+        active = [entry for entry in active if entry[2] >= start]
+        for other_id, other_start, other_end in active:
+            conflicts.append({
+                "kind": "rota",
+                "assignment_id": other_id,
+                "conflicting_id": assignment_id,
+                "start": start,
+                "end": min(end, other_end),
+            })
+        active.append((assignment_id, start, end))
+
+    session_rows = db.execute(
+        select(models.VolunteerAssignment.id, models.PackingSession.scheduled_date)
+        .join(models.PackingSession, models.PackingSession.id == models.VolunteerAssignment.packing_session_id)
+        .where(models.VolunteerAssignment.user_id == user_id)
+        .order_by(models.PackingSession.scheduled_date, models.VolunteerAssignment.id)
+    ).all()
+    by_day = {}
+    for assignment_id, scheduled_date in session_rows:
+        by_day.setdefault(scheduled_date.date(), []).append(assignment_id)
+    for day, assignment_ids in by_day.items():
+        start, end = _day(datetime.combine(day, time.min))
+        for first, second in combinations(assignment_ids, 2):
+            conflicts.append({
+                "kind": "packing_session",
+                "assignment_id": first,
+                "conflicting_id": second,
+                "start": start,
+                "end": end,
+            })
+    return conflicts
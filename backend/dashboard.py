@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from sqlalchemy import String, cast, func, literal, select, union_all
+from sqlalchemy.orm import Session
+from backend import models
+from backend.cache import TTLCache
+from backend.changes import persisted_versions
+import os
+
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+
+SUMMARY_TABLES = (
+    "agencies", "families", "items", "item_stock_levels", "packing_lists",
+    "packing_sessions", "food_boxes", "orders", "users",
+)
+
+summary_cache = TTLCache(maxsize=8, ttl=DASHBOARD_CACHE_TTL)
+
+def _count(metric: str, model, key=None, *criteria):
+    key_column = cast(key, String) if key is not None else literal("")
+    query = select(literal(metric), key_column, func.count()).select_from(model).where(*criteria)
+    if key is not None:
+        query = query.group_by(key)
+    return query
+
+def _status_name(enum_class, stored):
+    # SQLEnum columns store the member name, plain string columns the value.
+    if enum_class is not None and stored in enum_class.__members__:
+        return enum_class[stored].value
+    return stored
+
+def build_summary(db: Session, now: datetime = None):
+    now = now or datetime.utcnow()
+    week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    query = union_all(
+        _count("agencies", models.Agency, models.Agency.is_active),
+        _count("families", models.Family, models.Family.status),
+        _count("items", models.Item),
+        _count("packing_lists", models.PackingList, models.PackingList.status),
+        _count("orders", models.Order, models.Order.status),
+        _count(
+            "upcoming_sessions", models.PackingSession, None,
+            models.PackingSession.status == models.PackingStatus.SCHEDULED,
+            models.PackingSession.scheduled_date >= now,
+        ),
+        _count("boxes_packed_this_week", models.FoodBox, None, models.FoodBox.created_at >= week_start),
+        _count(
+            "active_volunteers", models.User, None,
+            models.User.is_active.is_(True),
+            models.User.role == models.UserRole.PACKING_VOLUNTEER,
+        ),
+        _count(
+            "low_stock_items", models.ItemStockLevel, None,
+            models.ItemStockLevel.below_min.is_(True),
+        ),
+    )
+
+    grouped = {}
+    for metric, key, count in db.execute(query):
+        grouped.setdefault(metric, {})[key] = count
+
+    def by_status(metric, enum_class=None):
+        counts = {_status_name(enum_class, key): count for key, count in grouped.get(metric, {}).items()}
+        if enum_class is not None:
+            for member in enum_class:
+                counts.setdefault(member.value, 0)
+        return counts
+
+    def scalar(metric):
+        return grouped.get(metric, {}).get("", 0)
+
+    agencies = grouped.get("agencies", {})
+    active_agencies = sum(count for key, count in agencies.items() if key in ("1", "true"))
+    orders = by_status("orders", models.OrderStatus)
+    return {
+        "total_agencies": sum(agencies.values()),
+        "active_agencies": active_agencies,
+        "families_by_status": by_status("families", models.FamilyStatus),
+        "total_items": scalar("items"),
+        "low_stock_items": scalar("low_stock_items"),
+        "packing_lists_by_status": by_status("packing_lists", models.PackingStatus),
+        "orders_by_status": orders,
+        "pending_orders": orders[models.OrderStatus.PENDING.value],
+        "upcoming_sessions": scalar("upcoming_sessions"),
+        "boxes_packed_this_week": scalar("boxes_packed_this_week"),
+        "active_volunteers": scalar("active_volunteers"),
+        "generated_at": now,
+    }
+
+def get_summary(db: Session):
+    # Keyed on the persisted table versions, so a write on any worker
+    # invalidates; the TTL covers the time-based counts (this week, upcoming).
+    versions = persisted_versions(db, *SUMMARY_TABLES)
+    key = tuple(versions.get(table, (0, None))[0] for table in SUMMARY_TABLES)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = build_summary(db)
+        summary_cache.set(key, summary)
+    return summary
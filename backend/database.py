@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from anyio import CapacityLimiter, Semaphore, to_thread
 import os
 from dotenv import load_dotenv
 
@@ -8,18 +10,90 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./storehouse.db")
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+# Route handlers are synchronous, so FastAPI runs them in its worker threadpool
+# instead of on the event loop. This sets both the size of that threadpool and
+# how many requests may hold a database session at the same time.
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "40"))
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool sizing (file-backed SQLite and server databases). By default
+# the pool can hand every worker thread a connection at once.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(max(0, DB_THREADPOOL_SIZE - DB_POOL_SIZE))))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
-Base = declarative_base()
+# SQLite pragmas applied to every new connection. WAL lets readers run while a
+# write is in progress, and NORMAL sync is durable in WAL mode except on power loss.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
-def get_db():
-    db = SessionLocal()
+def sqlite_pragmas():
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -SQLITE_CACHE_SIZE_KB,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
     try:
-        yield db
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
     finally:
-        db.close()
+        cursor.close()
+
+def _is_sqlite_memory(url: str):
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def create_database_engine(url: str = DATABASE_URL, tune_sqlite: bool = True):
+    pool_options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+        if _is_sqlite_memory(url):
+            # Every connection to :memory: would be a separate empty database.
+            db_engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+        else:
+            connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+            db_engine = create_engine(url, connect_args=connect_args, **pool_options)
+        if tune_sqlite:
+            event.listen(db_engine, "connect", _apply_sqlite_pragmas)
+        return db_engine
+    return create_engine(url, pool_pre_ping=True, **pool_options)
+
+def pool_capacity(db_engine):
+    pool = db_engine.pool
+    if isinstance(pool, StaticPool):
+        return 1
+    return pool.size() + max(0, pool._max_overflow)
+
+engine = create_database_engine()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+Base = declarative_base()
+
+# Never admit more requests than the pool can serve: a request that waits for a
+# connection inside a worker thread can starve the requests holding one.
+db_slots = Semaphore(min(DB_THREADPOOL_SIZE, pool_capacity(engine)))
+
+async def get_db():
+    # A request keeps its connection across several threadpool hops (auth,
+    # handler, response validation). Waiting for a slot here, on the event loop,
+    # means worker threads never sit blocked on an exhausted pool.
+    async with db_slots:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await to_thread.run_sync(db.close, limiter=CapacityLimiter(1))
@@ -0,0 +1,174 @@
+from collections import defaultdict
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from backend import models
+from backend.database import SessionLocal, db_slots
+from backend.serialization import dumps
+import asyncio
+import os
+import threading
+
+# Events queued for a client that is not reading; past this it is sent a
+# single "resync" event instead and should reload the list.
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+# Comment lines sent on idle streams so proxies do not close them.
+EVENT_KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", "15"))
+
+FOOD_BOX_FIELDS = ("id", "family_id", "packing_session_id", "box_number", "status", "collected_at", "updated_at")
+
+def _frame(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+RESYNC = _frame("resync", {})
+KEEPALIVE = b": keepalive\n\n"
+
+class Subscription:
+    def __init__(self, broker, topic, loop):
+        self.broker = broker
+        self.topic = topic
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+    def deliver(self, frame: bytes):
+        # Runs on the subscriber's event loop.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            frame = RESYNC
+        self.queue.put_nowait(frame)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class Broker:
+    # In-process fan-out. publish() is called from the threadpool after a
+    # commit; each event is encoded once and handed to every subscriber's
+    # event loop with call_soon_threadsafe. Only streams served by this
+    # process receive it.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, topic) -> Subscription:
+        subscription = Subscription(self, topic, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def has_subscribers(self, topic=None) -> bool:
+        with self._lock:
+            return bool(self._subscribers) if topic is None else topic in self._subscribers
+
+    def publish(self, topic, frame: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, frame)
+            except RuntimeError:  # the subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+broker = Broker()
+
+def session_topic(session_id: int):
+    return ("packing_session", session_id)
+
+def _food_box_payload(food_box) -> dict:
+    if isinstance(food_box, models.FoodBox):
+        return {field: getattr(food_box, field) for field in FOOD_BOX_FIELDS}
+    return dict(zip(FOOD_BOX_FIELDS, food_box))
+
+def food_boxes_changed(food_boxes):
+    # One "food_boxes" event per packing session, listing the changed boxes.
+    # Takes FoodBox objects or rows in FOOD_BOX_FIELDS order. Call after commit.
+    if not broker.has_subscribers():
+        return
+    by_session = defaultdict(list)
+    for food_box in food_boxes:
+        payload = _food_box_payload(food_box)
+        by_session[payload["packing_session_id"]].append(payload)
+    for session_id, payloads in by_session.items():
+        topic = session_topic(session_id)
+        if broker.has_subscribers(topic):
+            broker.publish(topic, _frame("food_boxes", {"food_boxes": payloads}))
+
+def food_box_ids_changed(db: Session, ids, chunk_size: int = 1000):
+    # For bulk writes, which only know the ids: reads the changed boxes back,
+    # and only while someone is listening.
+    ids = [food_box_id for food_box_id in ids if food_box_id is not None]
+    if not ids or not broker.has_subscribers():
+        return
+    columns = [getattr(models.FoodBox, field) for field in FOOD_BOX_FIELDS]
+    for start in range(0, len(ids), chunk_size):
+        rows = db.execute(select(*columns).where(models.FoodBox.id.in_(ids[start:start + chunk_size]))).all()
+        food_boxes_changed(rows)
+
+def _session_payload(session_id, status, scheduled_date):
+    return {"id": session_id, "status": status, "scheduled_date": scheduled_date}
+
+def session_changed(session: models.PackingSession):
+    topic = session_topic(session.id)
+    if broker.has_subscribers(topic):
+        broker.publish(topic, _frame("session", _session_payload(session.id, session.status, session.scheduled_date)))
+
+def _snapshot(session_id: int):
+    # The session and its box counts by status (covered by the
+    # packing_session_id, status index), so a client can start from the
+    # stream without loading the box list.
+    db = SessionLocal()
+    try:
+        session = db.execute(
+            select(models.PackingSession.id, models.PackingSession.status, models.PackingSession.scheduled_date)
+            .where(models.PackingSession.id == session_id)
+        ).first()
+        if session is None:
+            return None
+        counts = dict(db.execute(
+            select(models.FoodBox.status, func.count())
+            .where(models.FoodBox.packing_session_id == session_id)
+            .group_by(models.FoodBox.status)
+        ).all())
+        return _frame("snapshot", {"session": _session_payload(*session), "box_counts": counts})
+    finally:
+        db.close()
+
+async def _stream(subscription: Subscription, snapshot: bytes):
+    try:
+        yield snapshot
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), EVENT_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+    finally:
+        subscription.close()
+
+async def session_stream(session_id: int):
+    # Subscribes before reading the snapshot so nothing committed in between
+    # is missed. Returns None when the session does not exist. The snapshot
+    # uses its own short-lived session: an open stream holds no connection.
+    subscription = broker.subscribe(session_topic(session_id))
+    try:
+        async with db_slots:
+            snapshot = await run_in_threadpool(_snapshot, session_id)
+    except BaseException:
+        subscription.close()
+        raise
+    if snapshot is None:
+        subscription.close()
+        return None
+    return StreamingResponse(
+        _stream(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
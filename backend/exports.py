@@ -0,0 +1,96 @@
+from datetime import date, datetime
+from anyio import to_thread
+from fastapi import HTTPException
+from fastapi.concurrency import iterate_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from backend import models
+from backend.database import db_slots, engine
+import csv
+import enum
+import io
+import json
+import os
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORTS = {
+    "families": models.Family,
+    "food-boxes": models.FoodBox,
+    "orders": models.Order,
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _batches(statement, batch_size):
+    # Core rows straight off a server-side cursor, batch_size at a time: no ORM
+    # objects, no Pydantic models, and never more than one batch in memory.
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for rows in result.partitions():
+            yield rows
+
+def _csv_chunks(statement, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(statement.selected_columns.keys())
+    for rows in _batches(statement, batch_size):
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson_chunks(statement, batch_size):
+    keys = statement.selected_columns.keys()
+    for rows in _batches(statement, batch_size):
+        yield "".join(
+            json.dumps(dict(zip(keys, map(_plain, row))), separators=(",", ":")) + "\n"
+            for row in rows
+        )
+
+async def _admitted(chunks):
+    # Holds a db_slots slot for as long as the stream's connection is checked
+    # out, so streams count against the pool like any other request.
+    async with db_slots:
+        try:
+            async for chunk in iterate_in_threadpool(chunks):
+                yield chunk
+        finally:
+            await to_thread.run_sync(chunks.close)
+
+def stream_rows(
+    statement, filename: str, format: str = "csv", batch_size: int = None, headers: dict = None, admit: bool = True,
+):
+    # Streams any Core select as CSV or NDJSON over its own connection. The
+    # stream takes a db_slots slot; pass admit=False only from a request that
+    # holds a get_db slot (kept until the response ends) and has closed its
+    # session, or the two would need two slots.
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be csv or ndjson")
+    chunks = (_csv_chunks if format == "csv" else _ndjson_chunks)(statement, batch_size or EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        _admitted(chunks) if admit else chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"', **(headers or {})},
+    )
+
+def stream_export(dataset: str, format: str = "csv", batch_size: int = None):
+    model = EXPORTS.get(dataset)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    table = model.__table__
+    return stream_rows(
+        select(table).order_by(table.c.id), f"{dataset}-{datetime.utcnow():%Y%m%d}", format, batch_size,
+    )
@@ -0,0 +1,246 @@
+from datetime import datetime, time, timedelta
+from math import ceil
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from backend import models
+from backend.cache import TTLCache
+from backend.changes import persisted_versions
+import numpy as np
+import os
+
+# Forecasts only change when a week starts or the history is written to. The
+# caches are keyed on the persisted table versions, which every worker
+# process sees, so the TTL only bounds memory.
+FORECAST_CACHE_TTL = int(os.getenv("FORECAST_CACHE_TTL", "3600"))
+# Weeks of history read; three years holds the two full seasons the seasonal
+# index needs.
+FORECAST_HISTORY_WEEKS = int(os.getenv("FORECAST_HISTORY_WEEKS", "156"))
+SEASON_WEEKS = 52
+
+LIST_TABLES = ("packing_lists", "packing_list_items")
+REQUIREMENT_TABLES = ("weekly_requirements",)
+
+# The two halves of the history are cached separately, so a new weekly
+# requirement only re-reads the box counts, not the packing lists.
+_lists_cache = TTLCache(maxsize=8, ttl=FORECAST_CACHE_TTL)
+_boxes_cache = TTLCache(maxsize=8, ttl=FORECAST_CACHE_TTL)
+forecast_cache = TTLCache(maxsize=32, ttl=FORECAST_CACHE_TTL)
+
+def week_of(value: datetime):
+    start = datetime.combine(value.date(), time.min)
+    return start - timedelta(days=start.weekday())
+
+def _week_index(first_week: datetime, values):
+    return np.array([(week_of(value) - first_week).days // 7 for value in values], dtype=np.int64)
+
+def _phase(week: datetime):
+    # Week of the year, with ISO week 53 folded into 52.
+    return min(week.isocalendar()[1], SEASON_WEEKS) - 1
+
+def history_versions(db: Session):
+    # {table: version} for the history tables, from table_versions (one
+    # primary key read), so writes made by other workers invalidate too.
+    versions = persisted_versions(db, *LIST_TABLES, *REQUIREMENT_TABLES)
+    return {table: versions.get(table, (0, None))[0] for table in LIST_TABLES + REQUIREMENT_TABLES}
+
+def _list_history(db: Session, first_week: datetime, weeks: int, versions: dict):
+    # (item ids, item x week list totals, boxes on the lists each week).
+    key = (first_week, weeks, tuple(versions[table] for table in LIST_TABLES))
+    cached = _lists_cache.get(key)
+    if cached is not None:
+        return cached
+    lists = db.execute(
+        select(models.PackingList.id, models.PackingList.week_start, models.PackingList.total_boxes)
+        .where(
+            models.PackingList.week_start >= first_week,
+            models.PackingList.week_start < first_week + timedelta(weeks=weeks),
+        )
+    ).all()
+    list_boxes = np.zeros(weeks)
+    if not lists:
+        cached = (np.zeros(0, dtype=np.int64), np.zeros((0, weeks)), list_boxes)
+        _lists_cache.set(key, cached)
+        return cached
+    list_week = dict(zip((list_id for list_id, _, _ in lists), _week_index(first_week, [start for _, start, _ in lists])))
+    np.add.at(list_boxes, [list_week[list_id] for list_id, _, _ in lists], [boxes or 0 for _, _, boxes in lists])
+
+    lines = db.execute(
+        select(models.PackingListItem.packing_list_id, models.PackingListItem.item_id, models.PackingListItem.total_quantity_needed)
+        .where(models.PackingListItem.packing_list_id.in_(list(list_week)))
+    ).all()
+    item_ids = np.unique(np.array([item_id for _, item_id, _ in lines], dtype=np.int64))
+    totals = np.zeros((len(item_ids), weeks))
+    if lines:
+        np.add.at(
+            totals,
+            (
+                np.searchsorted(item_ids, [item_id for _, item_id, _ in lines]),
+                [list_week[list_id] for list_id, _, _ in lines],
+            ),
+            [quantity or 0.0 for _, _, quantity in lines],
+        )
+    cached = (item_ids, totals, list_boxes)
+    _lists_cache.set(key, cached)
+    return cached
+
+def _requirement_boxes(db: Session, first_week: datetime, weeks: int, versions: dict):
+    # Boxes requested by all agencies each week.
+    key = (first_week, weeks, tuple(versions[table] for table in REQUIREMENT_TABLES))
+    boxes = _boxes_cache.get(key)
+    if boxes is not None:
+        return boxes
+    rows = db.execute(
+        select(models.WeeklyRequirement.week_start, func.sum(models.WeeklyRequirement.total_boxes))
+        .where(
+            models.WeeklyRequirement.week_start >= first_week,
+            models.WeeklyRequirement.week_start < first_week + timedelta(weeks=weeks),
+        )
+        .group_by(models.WeeklyRequirement.week_start)
+    ).all()
+    boxes = np.zeros(weeks)
+    if rows:
+        np.add.at(boxes, _week_index(first_week, [start for start, _ in rows]), [total or 0 for _, total in rows])
+    _boxes_cache.set(key, boxes)
+    return boxes
+
+def demand_history(db: Session, week: datetime, versions: dict = None):
+    # Item x week demand up to and including week. A week with a packing list
+    # uses the list totals; a week with only requirements uses its box count
+    # times the per-box quantities of the latest earlier list. History starts
+    # at the first list, since before that there is no box contents to go on.
+    versions = versions or history_versions(db)
+    weeks = FORECAST_HISTORY_WEEKS
+    first_week = week - timedelta(weeks=weeks - 1)
+    item_ids, totals, list_boxes = _list_history(db, first_week, weeks, versions)
+    boxes = _requirement_boxes(db, first_week, weeks, versions)
+    has_list = list_boxes > 0
+    if not len(item_ids) or not has_list.any():
+        return item_ids, np.zeros((len(item_ids), 0)), []
+
+    per_box = np.divide(totals, list_boxes, out=np.zeros_like(totals), where=has_list)
+    latest = np.maximum.accumulate(np.where(has_list, np.arange(weeks), 0))
+    demand = np.where(has_list, totals, per_box[:, latest] * boxes)
+    start = int(np.argmax(has_list))
+    return item_ids, demand[:, start:], [first_week + timedelta(weeks=index) for index in range(start, weeks)]
+
+def seasonal_index(demand, phases):
+    # Classical additive decomposition: the 2x52 centred moving average is the
+    # trend, and each week of the year's index is its mean deviation from it,
+    # centred on zero. None without two full seasons of history.
+    items, weeks = demand.shape
+    if weeks < 2 * SEASON_WEEKS:
+        return None
+    half = SEASON_WEEKS // 2
+    sums = np.concatenate([np.zeros((items, 1)), np.cumsum(demand, axis=1)], axis=1)
+    means = (sums[:, SEASON_WEEKS:] - sums[:, :-SEASON_WEEKS]) / SEASON_WEEKS
+    centred = (means[:, 1:] + means[:, :-1]) / 2
+    deviations = demand[:, half:half + centred.shape[1]] - centred
+    membership = np.zeros((centred.shape[1], SEASON_WEEKS))
+    membership[np.arange(centred.shape[1]), phases[half:half + centred.shape[1]]] = 1
+    counts = membership.sum(axis=0)
+    seasonal = np.divide(deviations @ membership, counts, out=np.zeros((items, SEASON_WEEKS)), where=counts > 0)
+    return seasonal - seasonal.mean(axis=1, keepdims=True)
+
+def project(demand, phases, future_phases, window: int):
+    # Moving average and least-squares trend over the last window weeks of
+    # seasonally adjusted demand, projected over the future weeks with the
+    # seasonal index added back. All items at once.
+    seasonal = seasonal_index(demand, phases)
+    adjusted = demand if seasonal is None else demand - seasonal[:, phases]
+    recent = adjusted[:, -window:]
+    span = recent.shape[1]
+    average = recent.mean(axis=1)
+    offsets = np.arange(span) - (span - 1) / 2
+    trend = recent @ offsets / (offsets @ offsets) if span > 1 else np.zeros(len(recent))
+    steps = (span - 1) / 2 + np.arange(1, len(future_phases) + 1)
+    weekly = average[:, None] + trend[:, None] * steps
+    if seasonal is not None:
+        weekly += seasonal[:, future_phases]
+    return np.clip(weekly, 0, None), average, trend, seasonal is not None
+
+def forecast(db: Session, week: datetime, window: int, horizon: int):
+    versions = history_versions(db)
+    key = (week, window, horizon, tuple(sorted(versions.items())))
+    result = forecast_cache.get(key)
+    if result is not None:
+        return result
+    item_ids, demand, weeks = demand_history(db, week, versions)
+    future = [week + timedelta(weeks=step) for step in range(1, horizon + 1)]
+    if weeks:
+        weekly, average, trend, seasonal = project(
+            demand, np.array([_phase(value) for value in weeks]), np.array([_phase(value) for value in future]), window,
+        )
+    else:
+        weekly, average, trend, seasonal = np.zeros((0, horizon)), np.zeros(0), np.zeros(0), False
+    result = {
+        "item_ids": item_ids,
+        "weekly": weekly,
+        "average": average,
+        "trend": trend,
+        "seasonal": seasonal,
+        "history_weeks": len(weeks),
+        "window_weeks": min(window, len(weeks)),
+    }
+    forecast_cache.set(key, result)
+    return result
+
+def suggest_orders(db: Session, horizon: int = 4, window: int = 8, item_id: int = None, now: datetime = None):
+    # The cached forecast against current stock, open orders and each item's
+    # minimum level; those are read fresh on every call.
+    week = week_of(now or datetime.utcnow())
+    result = forecast(db, week, window, horizon)
+    item_ids = [int(value) for value in result["item_ids"]]
+    rows = range(len(item_ids))
+    if item_id is not None:
+        rows = [row for row in rows if item_ids[row] == item_id]
+    wanted = [item_ids[row] for row in rows]
+
+    items, levels, on_order = {}, {}, {}
+    if wanted:
+        items = {row.id: row for row in db.execute(
+            select(models.Item.id, models.Item.name, models.Item.unit).where(models.Item.id.in_(wanted))
+        )}
+        levels = {row.item_id: row for row in db.execute(
+            select(models.ItemStockLevel.item_id, models.ItemStockLevel.total_quantity, models.ItemStockLevel.min_quantity)
+            .where(models.ItemStockLevel.item_id.in_(wanted))
+        )}
+        open_orders = select(models.Order.id).where(
+            models.Order.status.in_((models.OrderStatus.PENDING, models.OrderStatus.CONFIRMED))
+        )
+        on_order = dict(db.execute(
+            select(models.OrderItem.item_id, func.sum(models.OrderItem.quantity))
+            .where(models.OrderItem.order_id.in_(open_orders), models.OrderItem.item_id.in_(wanted))
+            .group_by(models.OrderItem.item_id)
+        ).all())
+
+    suggestions = []
+    for row in rows:
+        current = item_ids[row]
+        if current not in items:
+            continue
+        level = levels.get(current)
+        in_stock = level.total_quantity if level is not None else 0.0
+        min_quantity = level.min_quantity if level is not None else 0.0
+        incoming = on_order.get(current) or 0.0
+        projected = float(result["weekly"][row].sum())
+        suggestions.append({
+            "item_id": current,
+            "item_name": items[current].name,
+            "unit": items[current].unit,
+            "weekly_average": round(float(result["average"][row]), 2),
+            "weekly_trend": round(float(result["trend"][row]), 2),
+            "forecast": [round(float(value), 2) for value in result["weekly"][row]],
+            "projected_demand": round(projected, 2),
+            "in_stock": in_stock,
+            "on_order": incoming,
+            "min_quantity": min_quantity,
+            "suggested_order": max(0, ceil(projected + min_quantity - in_stock - incoming - 1e-9)),
+        })
+    return {
+        "week_start": week,
+        "history_weeks": result["history_weeks"],
+        "window_weeks": result["window_weeks"],
+        "horizon_weeks": horizon,
+        "seasonal": result["seasonal"],
+        "items": suggestions,
+    }
@@ -0,0 +1,68 @@
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from backend.changes import PERSISTED_TABLES, persisted_versions
+from backend.database import get_db
+
+# Bump when the JSON shape of a cached endpoint changes, so clients holding a
+# response from an older release do not revalidate it as current.
+ETAG_GENERATION = "1"
+
+class Validators:
+    def __init__(self, etag: str, last_modified=None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def headers(self):
+        headers = {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers())
+        return response
+
+def _etag_matches(header: str, etag: str):
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    opaque = etag.removeprefix("W/")
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return any(candidate == "*" or candidate.removeprefix("W/") == opaque for candidate in candidates)
+
+def _not_modified_since(header: str, last_modified):
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+def conditional(*tables: str):
+    # Route dependency: looks up the shared versions of tables (one primary key
+    # read) and answers 304 before the handler runs its query when the client
+    # already has the current representation. Otherwise it returns the
+    # validators for the handler to put on its response.
+    unknown = set(tables) - PERSISTED_TABLES
+    if unknown:
+        raise ValueError(f"Table versions are not persisted for: {', '.join(sorted(unknown))}")
+
+    def dependency(request: Request, db: Session = Depends(get_db)):
+        versions = persisted_versions(db, *tables)
+        tag = ".".join(f"{table}-{versions.get(table, (0, None))[0]}" for table in tables)
+        stamps = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+        last_modified = max(stamps).replace(tzinfo=timezone.utc) if stamps else None
+        validators = Validators(f'W/"{ETAG_GENERATION}.{tag}"', last_modified)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            fresh = _etag_matches(if_none_match, validators.etag)
+        else:
+            if_modified_since = request.headers.get("if-modified-since")
+            fresh = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+        if fresh:
+            raise HTTPException(status_code=304, headers=validators.headers())
+        return validators
+
+    return dependency
@@ -0,0 +1,121 @@
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from backend import bulk, models, schemas
+from backend.changes import mark_changed
+import csv
+import os
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+
+DUPLICATE = "Duplicate of an existing row"
+
+def _normalize(value):
+    return " ".join(str(value).split()).casefold() if value is not None else ""
+
+class ImportSpec:
+    def __init__(self, model, create_schema, key_columns):
+        self.model = model
+        self.create_schema = create_schema
+        self.key_columns = key_columns
+
+    def key(self, values):
+        return tuple(_normalize(values.get(column)) for column in self.key_columns)
+
+    def required_columns(self):
+        return [name for name, field in self.create_schema.model_fields.items() if field.is_required()]
+
+# Natural keys used to skip rows that already exist (or repeat within the file).
+IMPORTS = {
+    "families": ImportSpec(models.Family, schemas.FamilyCreate, ("agency_id", "family_name", "contact_person")),
+    "items": ImportSpec(models.Item, schemas.ItemCreate, ("name", "category")),
+}
+
+def _existing_keys(db: Session, spec: ImportSpec):
+    columns = [getattr(spec.model, column) for column in spec.key_columns]
+    return {
+        tuple(_normalize(value) for value in row)
+        for row in db.execute(select(*columns)).yield_per(IMPORT_BATCH_SIZE)
+    }
+
+def _clean(row):
+    # Blank cells mean "not given", so schema defaults apply. An id column is
+    # ignored: imports only ever create rows.
+    return {
+        key.strip(): value.strip()
+        for key, value in row.items()
+        if key and key.strip() != "id" and value is not None and value.strip() != ""
+    }
+
+def _batches(reader, size):
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, _clean(row)))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def import_csv(db: Session, dataset: str, stream, dry_run: bool = False, batch_size: int = None):
+    # stream is a text file object; rows are read and validated one batch at a
+    # time, so only the batch and the key index are held in memory.
+    spec = IMPORTS.get(dataset)
+    if spec is None:
+        raise HTTPException(status_code=404, detail="Unknown import")
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        raise HTTPException(status_code=400, detail="CSV file is empty")
+    header = {name.strip() for name in reader.fieldnames if name}
+    missing = [column for column in spec.required_columns() if column not in header]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(missing)}")
+
+    seen = _existing_keys(db, spec)
+    agencies = None
+    if spec.model is models.Family:
+        agencies = set(db.execute(select(models.Agency.id)).scalars())
+
+    rows = duplicates = 0
+    created, errors = {}, {}
+    for batch in _batches(reader, batch_size or IMPORT_BATCH_SIZE):
+        rows += len(batch)
+        lines = [line for line, _ in batch]
+        creates, _, invalid = bulk.validate_rows(
+            spec.model, spec.create_schema, spec.create_schema, [values for _, values in batch]
+        )
+        for index, error in invalid.items():
+            errors[lines[index]] = error
+
+        accepted = []
+        for index, values in creates:
+            line = lines[index]
+            if agencies is not None and values["agency_id"] not in agencies:
+                errors[line] = "agency_id: Agency not found"
+                continue
+            key = spec.key(values)
+            if key in seen:
+                errors[line] = DUPLICATE
+                duplicates += 1
+                continue
+            seen.add(key)
+            accepted.append((line, values))
+
+        if dry_run:
+            created.update((line, None) for line, _ in accepted)
+        else:
+            bulk.insert_rows(db, spec.model, accepted, created, errors, returning=False)
+
+    if not dry_run:
+        mark_changed(db, spec.model.__tablename__)
+        db.commit()
+
+    return {
+        "dataset": dataset,
+        "rows": rows,
+        "created": len(created),
+        "duplicates": duplicates,
+        "failed": len(errors) - duplicates,
+        "dry_run": dry_run,
+        "errors": [{"line": line, "error": errors[line]} for line in sorted(errors)],
+    }
@@ -0,0 +1,256 @@
+from collections import defaultdict
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+from backend import models, stock
+from backend.changes import mark_changed
+
+# Movement reasons.
+RECEIVED = "received"                  # inventory added through /inventory/
+DELIVERY = "delivery"                  # order marked delivered
+DELIVERY_REVERSED = "delivery_reversed"
+PACKED = "packed"                      # consumed by a food box
+
+def record(db: Session, movements, apply: bool = True):
+    # Writes movements (dicts with item_id, inventory_item_id, quantity_delta,
+    # reason and optionally order_id / food_box_id) inside the caller's
+    # transaction. With apply, each delta is added to its batch as a relative
+    # UPDATE (quantity = quantity + delta), so concurrent writers cannot lose
+    # each other's changes; without, the batch already holds the quantity.
+    # balance_after is the item's total stock after the movement, taken from
+    # the refreshed item_stock_levels, so the ledger always agrees with it.
+    if not movements:
+        return
+    if apply:
+        deltas = defaultdict(float)
+        for movement in movements:
+            deltas[movement["inventory_item_id"]] += movement["quantity_delta"]
+        inventory = models.InventoryItem.__table__
+        db.connection().execute(
+            update(inventory)
+            .where(inventory.c.id == bindparam("batch_id"))
+            .values(quantity=inventory.c.quantity + bindparam("delta")),
+            [{"batch_id": batch_id, "delta": delta} for batch_id, delta in deltas.items()],
+        )
+        mark_changed(db, models.InventoryItem.__tablename__)
+
+    item_ids = {movement["item_id"] for movement in movements}
+    stock.refresh_levels(db, item_ids)
+    totals = stock.stock_totals(db, list(item_ids))
+    # Walk each item's movements backwards from its new total.
+    balance = {item_id: totals.get(item_id, 0.0) for item_id in item_ids}
+    rows = []
+    for movement in reversed(movements):
+        rows.append({
+            "order_id": None,
+            "food_box_id": None,
+            **movement,
+            "balance_after": balance[movement["item_id"]],
+        })
+        balance[movement["item_id"]] -= movement["quantity_delta"]
+    rows.reverse()
+    db.connection().execute(insert(models.StockMovement.__table__), rows)
+    mark_changed(db, models.StockMovement.__tablename__)
+
+def received(db: Session, batch: models.InventoryItem):
+    # A batch created through the inventory endpoints (already flushed).
+    record(db, [{
+        "item_id": batch.item_id, "inventory_item_id": batch.id,
+        "quantity_delta": batch.quantity, "reason": RECEIVED,
+    }], apply=False)
+
+def _receive_order(db: Session, order: models.Order):
+    # Each line becomes a new batch holding the delivered quantity.
+    lines = db.execute(
+        select(models.OrderItem.item_id, models.OrderItem.quantity)
+        .where(models.OrderItem.order_id == order.id, models.OrderItem.quantity > 0)
+        .order_by(models.OrderItem.id)
+    ).all()
+    if not lines:
+        return
+    batch_ids = db.execute(
+        insert(models.InventoryItem).returning(models.InventoryItem.id, sort_by_parameter_order=True),
+        [{"item_id": item_id, "quantity": quantity, "location": stock.UNASSIGNED_LOCATION} for item_id, quantity in lines],
+    ).scalars().all()
+    mark_changed(db, models.InventoryItem.__tablename__)
+    record(db, [
+        {"item_id": item_id, "inventory_item_id": batch_id, "quantity_delta": quantity,
+         "reason": DELIVERY, "order_id": order.id}
+        for (item_id, quantity), batch_id in zip(lines, batch_ids)
+    ], apply=False)
+
+def _reverse_order(db: Session, order: models.Order):
+    # Takes back what the order's deliveries (net of earlier reversals) added,
+    # from the same batches.
+    movement = models.StockMovement
+    net = defaultdict(float)
+    for item_id, batch_id, delta in db.execute(
+        select(movement.item_id, movement.inventory_item_id, movement.quantity_delta)
+        .where(movement.order_id == order.id, movement.reason.in_((DELIVERY, DELIVERY_REVERSED)))
+    ):
+        net[item_id, batch_id] += delta
+    record(db, [
+        {"item_id": item_id, "inventory_item_id": batch_id, "quantity_delta": -delta,
+         "reason": DELIVERY_REVERSED, "order_id": order.id}
+        for (item_id, batch_id), delta in sorted(net.items()) if delta > 0
+    ])
+
+def _reconcile_order(db: Session, order_id: int):
+    # Brings what a delivered order has put in stock (its deliveries net of
+    # reversals) in line with its current lines: shortfalls arrive as new
+    # batches, excess is taken back from the order's newest batches first.
+    movement = models.StockMovement
+    net = defaultdict(float)
+    for item_id, batch_id, delta in db.execute(
+        select(movement.item_id, movement.inventory_item_id, movement.quantity_delta)
+        .where(movement.order_id == order_id, movement.reason.in_((DELIVERY, DELIVERY_REVERSED)))
+    ):
+        net[item_id, batch_id] += delta
+    delivered = defaultdict(float)
+    for (item_id, _), quantity in net.items():
+        delivered[item_id] += quantity
+    wanted = defaultdict(float)
+    for item_id, quantity in db.execute(
+        select(models.OrderItem.item_id, models.OrderItem.quantity)
+        .where(models.OrderItem.order_id == order_id, models.OrderItem.quantity > 0)
+    ):
+        wanted[item_id] += quantity
+
+    added, reversals = [], []
+    for item_id in sorted(set(wanted) | set(delivered)):
+        difference = wanted[item_id] - delivered[item_id]
+        if difference > 1e-9:
+            added.append((item_id, difference))
+        elif difference < -1e-9:
+            excess = -difference
+            for (_, batch_id), quantity in sorted(
+                ((key, quantity) for key, quantity in net.items() if key[0] == item_id and quantity > 1e-9), reverse=True,
+            ):
+                amount = min(quantity, excess)
+                reversals.append({
+                    "item_id": item_id, "inventory_item_id": batch_id, "quantity_delta": -amount,
+                    "reason": DELIVERY_REVERSED, "order_id": order_id,
+                })
+                excess -= amount
+                if excess <= 1e-9:
+                    break
+    if added:
+        batch_ids = db.execute(
+            insert(models.InventoryItem).returning(models.InventoryItem.id, sort_by_parameter_order=True),
+            [{"item_id": item_id, "quantity": quantity, "location": stock.UNASSIGNED_LOCATION} for item_id, quantity in added],
+        ).scalars().all()
+        mark_changed(db, models.InventoryItem.__tablename__)
+        record(db, [
+            {"item_id": item_id, "inventory_item_id": batch_id, "quantity_delta": quantity,
+             "reason": DELIVERY, "order_id": order_id}
+            for (item_id, quantity), batch_id in zip(added, batch_ids)
+        ], apply=False)
+    record(db, reversals)
+
+def order_lines_changed(db: Session, item_ids=(), order_ids=(), chunk_size: int = 1000):
+    # Call after order items are written (flushed), before commit, with the
+    # written lines and any orders that lost lines. Lines added to, changed on
+    # or removed from a delivered order move stock as the delivery did, so a
+    # later reversal takes back exactly what the order put in.
+    order_ids = set(order_ids)
+    item_ids = [item_id for item_id in item_ids if item_id is not None]
+    for start in range(0, len(item_ids), chunk_size):
+        order_ids.update(db.execute(
+            select(models.OrderItem.order_id).where(models.OrderItem.id.in_(item_ids[start:start + chunk_size]))
+        ).scalars())
+    order_ids = sorted(order_id for order_id in order_ids if order_id is not None)
+    delivered = []
+    for start in range(0, len(order_ids), chunk_size):
+        delivered.extend(db.execute(
+            select(models.Order.id).where(
+                models.Order.id.in_(order_ids[start:start + chunk_size]),
+                models.Order.status == models.OrderStatus.DELIVERED,
+            )
+        ).scalars())
+    for order_id in sorted(delivered):
+        _reconcile_order(db, order_id)
+
+def order_status_changed(db: Session, order: models.Order, previous_status):
+    # Call after the order is flushed, before commit.
+    delivered = models.OrderStatus.DELIVERED
+    if order.status == delivered and previous_status != delivered:
+        _receive_order(db, order)
+    elif previous_status == delivered and order.status != delivered:
+        _reverse_order(db, order)
+
+def boxes_packed(db: Session, food_box_ids):
+    # Consumes the per-box quantities of each new box's packing list, in
+    # first-expiry-first-out order, with one allocation per item for the
+    # whole batch of boxes. Boxes that already have movements are skipped, so
+    # calling it twice is harmless. Stock that is not there is still taken
+    # from the item's last batch (or a new empty one), which goes negative and
+    # shows up as below minimum until it is recounted.
+    food_box_ids = sorted({food_box_id for food_box_id in food_box_ids if food_box_id is not None})
+    if not food_box_ids:
+        return
+    movement = models.StockMovement
+    done = set(db.execute(
+        select(movement.food_box_id).where(movement.food_box_id.in_(food_box_ids)).distinct()
+    ).scalars())
+    boxes = db.execute(
+        select(models.FoodBox.id, models.PackingSession.packing_list_id)
+        .join(models.PackingSession, models.PackingSession.id == models.FoodBox.packing_session_id)
+        .where(models.FoodBox.id.in_(food_box_ids))
+        .order_by(models.FoodBox.id)
+    ).all()
+    boxes = [(food_box_id, packing_list_id) for food_box_id, packing_list_id in boxes if food_box_id not in done]
+    if not boxes:
+        return
+
+    contents = defaultdict(list)
+    for packing_list_id, item_id, quantity in db.execute(
+        select(
+            models.PackingListItem.packing_list_id, models.PackingListItem.item_id,
+            models.PackingListItem.quantity_per_box,
+        ).where(models.PackingListItem.packing_list_id.in_({packing_list_id for _, packing_list_id in boxes}))
+    ):
+        if quantity > 0:
+            contents[packing_list_id].append((item_id, quantity))
+    needs = defaultdict(list)  # item -> [(food box, quantity)] in box order
+    for food_box_id, packing_list_id in boxes:
+        for item_id, quantity in contents[packing_list_id]:
+            needs[item_id].append((food_box_id, quantity))
+    if not needs:
+        return
+
+    # Expired batches are left on the shelf, as on the pick list.
+    usable_on = stock.today()
+    batches = stock.fefo_batches(db, needs, in_stock_only=False, lock=True, usable_on=usable_on)
+    missing = [item_id for item_id in needs if item_id not in batches]
+    if missing:
+        # No usable batch to record a shortfall against. The re-read skips
+        # expired batches too, so only the new undated batch comes back.
+        db.execute(insert(models.InventoryItem), [
+            {"item_id": item_id, "quantity": 0.0, "location": stock.UNASSIGNED_LOCATION} for item_id in missing
+        ])
+        batches.update(stock.fefo_batches(db, missing, in_stock_only=False, usable_on=usable_on))
+
+    movements = []
+    for item_id, wanted in needs.items():
+        picks, shortfall = stock.allocate(batches[item_id], sum(quantity for _, quantity in wanted))
+        if shortfall > 0:
+            last = batches[item_id][-1]
+            if picks and picks[-1][0].id == last.id:
+                picks[-1] = (last, picks[-1][1] + shortfall)
+            else:
+                picks.append((last, shortfall))
+        # Hand the picks out to the boxes in order, splitting where a box
+        # spans two batches.
+        picks = [[batch, amount] for batch, amount in picks]
+        for food_box_id, quantity in wanted:
+            while quantity > 1e-9 and picks:
+                batch, available = picks[0]
+                amount = min(available, quantity)
+                movements.append({
+                    "item_id": item_id, "inventory_item_id": batch.id, "quantity_delta": -amount,
+                    "reason": PACKED, "food_box_id": food_box_id,
+                })
+                quantity -= amount
+                picks[0][1] -= amount
+                if picks[0][1] <= 1e-9:
+                    picks.pop(0)
+    record(db, movements)
@@ -1,18 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, File, HTTPException, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from backend.database import SessionLocal, engine, get_db
-from backend import models, schemas, auth
+from backend.database import SessionLocal, engine, get_db, DB_THREADPOOL_SIZE
+from backend import models, schemas, auth, boxes, bulk, compression, conflicts, dashboard, events, exports, forecast, http_cache, imports, ledger, packing, scheduler, serialization, spend, startup, stock
 from backend.models import User, UserRole
 from backend.auth import get_password_hash, get_current_active_user
+from backend.pagination import NEXT_CURSOR_HEADER, paginate, set_next_cursor
 from datetime import datetime, timedelta
 from typing import List, Optional
+from anyio import to_thread
+from contextlib import asynccontextmanager
+import io
 import uvicorn
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    to_thread.current_default_thread_limiter().total_tokens = DB_THREADPOOL_SIZE
+    # Schema upgrade (AUTO_MIGRATE) and warm-up run here, not at import time,
+    # so importing the app stays cheap for reloads and worker spawns.
+    app.state.startup = await run_in_threadpool(startup.run, engine)
+    yield
+    auth.shutdown_hash_pool()
 
-app = FastAPI(title="Storehouse Manager API", version="1.0.0")
+app = FastAPI(title="Storehouse Manager API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -21,11 +32,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
+# Response compression
+compression.add_compression(app)
+
 # Dependency to get current user
-def get_current_user_role(required_roles: List[UserRole]):
-    def role_checker(current_user: User = Depends(get_current_active_user)):
+def get_current_user_role(required_roles: List[UserRole], stream: bool = False):
+    # stream=True resolves the user without a get_db session, for endpoints
+    # whose response streams over its own connection.
+    user_dependency = auth.get_stream_user if stream else get_current_active_user
+    def role_checker(current_user: schemas.Principal = Depends(user_dependency)):
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -41,7 +59,7 @@ async def root():
 
 # Authentication endpoints
 @app.post("/auth/register", response_model=schemas.User)
-async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
     db_user = db.query(User).filter(User.email == user.email).first()
     if db_user:
@@ -51,7 +69,7 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = auth.run_password_job(get_password_hash, user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -65,7 +83,7 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @app.post("/auth/login", response_model=schemas.Token)
-async def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     user = auth.authenticate_user(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(
@@ -75,20 +93,40 @@ async def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_d
         )
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=auth.token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/auth/me", response_model=schemas.User)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
-    return current_user
+def read_users_me(
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@app.get("/auth/cache-stats")
+async def read_auth_cache_stats(
+    current_user: schemas.Principal = Depends(get_current_user_role([UserRole.COORDINATOR]))
+):
+    return auth.principal_cache_stats()
+
+# Dashboard endpoints
+@app.get("/dashboard/summary", response_model=schemas.DashboardSummary)
+def read_dashboard_summary(
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    return dashboard.get_summary(db)
 
 # Agency endpoints
 @app.post("/agencies/", response_model=schemas.Agency)
-async def create_agency(
+def create_agency(
     agency: schemas.AgencyCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_agency = models.Agency(**agency.dict())
     db.add(db_agency)
@@ -97,32 +135,40 @@ async def create_agency(
     return db_agency
 
 @app.get("/agencies/", response_model=List[schemas.Agency])
-async def read_agencies(
+def read_agencies(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user),
+    validators: http_cache.Validators = Depends(http_cache.conditional("agencies"))
 ):
-    agencies = db.query(models.Agency).offset(skip).limit(limit).all()
-    return agencies
+    names = serialization.field_names(schemas.Agency, fields)
+    query = serialization.select_for(schemas.Agency, models.Agency, names)
+    agencies = db.execute(paginate(query, models.Agency.id, skip, limit, cursor)).all()
+    return validators.apply(serialization.rows_response(agencies, schemas.Agency, limit, names))
 
 @app.get("/agencies/{agency_id}", response_model=schemas.Agency)
-async def read_agency(
+def read_agency(
     agency_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user),
+    validators: http_cache.Validators = Depends(http_cache.conditional("agencies"))
 ):
     agency = db.query(models.Agency).filter(models.Agency.id == agency_id).first()
     if agency is None:
         raise HTTPException(status_code=404, detail="Agency not found")
+    validators.apply(response)
     return agency
 
 # Family endpoints
 @app.post("/families/", response_model=schemas.Family)
-async def create_family(
+def create_family(
     family: schemas.FamilyCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_family = models.Family(**family.dict())
     db.add(db_family)
@@ -131,24 +177,27 @@ async def create_family(
     return db_family
 
 @app.get("/families/", response_model=List[schemas.Family])
-async def read_families(
+def read_families(
     agency_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
-    query = db.query(models.Family)
+    names = serialization.field_names(schemas.Family, fields)
+    query = serialization.select_for(schemas.Family, models.Family, names)
     if agency_id:
         query = query.filter(models.Family.agency_id == agency_id)
-    families = query.offset(skip).limit(limit).all()
-    return families
+    families = db.execute(paginate(query, models.Family.id, skip, limit, cursor)).all()
+    return serialization.rows_response(families, schemas.Family, limit, names)
 
 @app.get("/families/{family_id}", response_model=schemas.Family)
-async def read_family(
+def read_family(
     family_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     family = db.query(models.Family).filter(models.Family.id == family_id).first()
     if family is None:
@@ -157,10 +206,10 @@ async def read_family(
 
 # Item endpoints
 @app.post("/items/", response_model=schemas.Item)
-async def create_item(
+def create_item(
     item: schemas.ItemCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_item = models.Item(**item.dict())
     db.add(db_item)
@@ -169,25 +218,29 @@ async def create_item(
     return db_item
 
 @app.get("/items/", response_model=List[schemas.Item])
-async def read_items(
+def read_items(
     category: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user),
+    validators: http_cache.Validators = Depends(http_cache.conditional("items"))
 ):
-    query = db.query(models.Item)
+    names = serialization.field_names(schemas.Item, fields)
+    query = serialization.select_for(schemas.Item, models.Item, names)
     if category:
         query = query.filter(models.Item.category == category)
-    items = query.offset(skip).limit(limit).all()
-    return items
+    items = db.execute(paginate(query, models.Item.id, skip, limit, cursor)).all()
+    return validators.apply(serialization.rows_response(items, schemas.Item, limit, names))
 
 # Weekly Requirement endpoints
 @app.post("/weekly-requirements/", response_model=schemas.WeeklyRequirement)
-async def create_weekly_requirement(
+def create_weekly_requirement(
     requirement: schemas.WeeklyRequirementCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_requirement = models.WeeklyRequirement(**requirement.dict())
     db.add(db_requirement)
@@ -196,25 +249,27 @@ async def create_weekly_requirement(
     return db_requirement
 
 @app.get("/weekly-requirements/", response_model=List[schemas.WeeklyRequirement])
-async def read_weekly_requirements(
+def read_weekly_requirements(
+    response: Response,
     agency_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.WeeklyRequirement)
     if agency_id:
         query = query.filter(models.WeeklyRequirement.agency_id == agency_id)
-    requirements = query.offset(skip).limit(limit).all()
-    return requirements
+    requirements = paginate(query, models.WeeklyRequirement.id, skip, limit, cursor).all()
+    return set_next_cursor(response, requirements, limit)
 
 # Packing List endpoints
 @app.post("/packing-lists/", response_model=schemas.PackingList)
-async def create_packing_list(
+def create_packing_list(
     packing_list: schemas.PackingListCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_packing_list = models.PackingList(**packing_list.dict())
     db.add(db_packing_list)
@@ -222,33 +277,60 @@ async def create_packing_list(
     db.refresh(db_packing_list)
     return db_packing_list
 
+@app.post("/packing-lists/generate", response_model=schemas.GeneratedPackingList)
+def generate_packing_list(
+    request: schemas.PackingListGenerate,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    template = None
+    if request.items is not None:
+        template = {item.item_id: item.quantity_per_box for item in request.items}
+    return packing.generate(db, request.week_start, request.week_end, template, request.dry_run)
+
 @app.get("/packing-lists/", response_model=List[schemas.PackingList])
-async def read_packing_lists(
+def read_packing_lists(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
-    packing_lists = db.query(models.PackingList).offset(skip).limit(limit).all()
-    return packing_lists
+    packing_lists = paginate(db.query(models.PackingList), models.PackingList.id, skip, limit, cursor).all()
+    return set_next_cursor(response, packing_lists, limit)
 
 @app.get("/packing-lists/{packing_list_id}", response_model=schemas.PackingList)
-async def read_packing_list(
+def read_packing_list(
     packing_list_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     packing_list = db.query(models.PackingList).filter(models.PackingList.id == packing_list_id).first()
     if packing_list is None:
         raise HTTPException(status_code=404, detail="Packing list not found")
     return packing_list
 
+@app.get("/packing-lists/{packing_list_id}/pick-list", response_model=schemas.PickList)
+def read_pick_list(
+    packing_list_id: int,
+    boxes: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    packing_list = db.query(models.PackingList).filter(models.PackingList.id == packing_list_id).first()
+    if packing_list is None:
+        raise HTTPException(status_code=404, detail="Packing list not found")
+    if boxes is not None and boxes < 1:
+        raise HTTPException(status_code=400, detail="boxes must be at least 1")
+    return packing.pick_list(db, packing_list, boxes)
+
 @app.put("/packing-lists/{packing_list_id}", response_model=schemas.PackingList)
-async def update_packing_list(
+def update_packing_list(
     packing_list_id: int,
     packing_list_update: schemas.PackingListUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_packing_list = db.query(models.PackingList).filter(models.PackingList.id == packing_list_id).first()
     if db_packing_list is None:
@@ -262,10 +344,10 @@ async def update_packing_list(
     return db_packing_list
 
 @app.delete("/packing-lists/{packing_list_id}")
-async def delete_packing_list(
+def delete_packing_list(
     packing_list_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_packing_list = db.query(models.PackingList).filter(models.PackingList.id == packing_list_id).first()
     if db_packing_list is None:
@@ -277,10 +359,10 @@ async def delete_packing_list(
 
 # Packing List Items endpoints
 @app.post("/packing-list-items/", response_model=schemas.PackingListItem)
-async def create_packing_list_item(
+def create_packing_list_item(
     item: schemas.PackingListItemCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_item = models.PackingListItem(**item.dict())
     db.add(db_item)
@@ -288,26 +370,39 @@ async def create_packing_list_item(
     db.refresh(db_item)
     return db_item
 
+@app.post("/packing-list-items/bulk", response_model=schemas.BulkResult)
+async def bulk_packing_list_items(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    rows = await bulk.read_rows(request)
+    return await run_in_threadpool(
+        bulk.apply, db, models.PackingListItem, schemas.PackingListItemCreate, schemas.PackingListItemUpdate, rows
+    )
+
 @app.get("/packing-list-items/", response_model=List[schemas.PackingListItem])
-async def read_packing_list_items(
+def read_packing_list_items(
+    response: Response,
     packing_list_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.PackingListItem)
     if packing_list_id:
         query = query.filter(models.PackingListItem.packing_list_id == packing_list_id)
-    items = query.offset(skip).limit(limit).all()
-    return items
+    items = paginate(query, models.PackingListItem.id, skip, limit, cursor).all()
+    return set_next_cursor(response, items, limit)
 
 @app.put("/packing-list-items/{item_id}", response_model=schemas.PackingListItem)
-async def update_packing_list_item(
+def update_packing_list_item(
     item_id: int,
     item_update: schemas.PackingListItemUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_item = db.query(models.PackingListItem).filter(models.PackingListItem.id == item_id).first()
     if db_item is None:
@@ -321,10 +416,10 @@ async def update_packing_list_item(
     return db_item
 
 @app.delete("/packing-list-items/{item_id}")
-async def delete_packing_list_item(
+def delete_packing_list_item(
     item_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_item = db.query(models.PackingListItem).filter(models.PackingListItem.id == item_id).first()
     if db_item is None:
@@ -336,66 +431,156 @@ async def delete_packing_list_item(
 
 # Inventory endpoints
 @app.post("/inventory/", response_model=schemas.InventoryItem)
-async def create_inventory_item(
+def create_inventory_item(
     inventory_item: schemas.InventoryItemCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_inventory_item = models.InventoryItem(**inventory_item.dict())
     db.add(db_inventory_item)
+    db.flush()
+    ledger.received(db, db_inventory_item)
     db.commit()
     db.refresh(db_inventory_item)
     return db_inventory_item
 
 @app.get("/inventory/", response_model=List[schemas.InventoryItem])
-async def read_inventory(
+def read_inventory(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
-    inventory_items = db.query(models.InventoryItem).offset(skip).limit(limit).all()
-    return inventory_items
+    names = serialization.field_names(schemas.InventoryItem, fields)
+    query = serialization.select_for(schemas.InventoryItem, models.InventoryItem, names)
+    inventory_items = db.execute(paginate(query, models.InventoryItem.id, skip, limit, cursor)).all()
+    return serialization.rows_response(inventory_items, schemas.InventoryItem, limit, names)
+
+@app.get("/inventory/levels", response_model=List[schemas.ItemStockLevel])
+def read_inventory_levels(
+    response: Response,
+    below_min: Optional[bool] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    query = db.query(models.ItemStockLevel)
+    if below_min is not None:
+        query = query.filter(models.ItemStockLevel.below_min.is_(below_min))
+    levels = paginate(query, models.ItemStockLevel.item_id, skip, limit, cursor).all()
+    return set_next_cursor(response, levels, limit, key="item_id")
+
+@app.get("/inventory/expiring-soon", response_model=List[schemas.ExpiringBatch])
+def read_expiring_inventory(
+    days: int = 14,
+    location: Optional[str] = None,
+    include_expired: bool = True,
+    limit: int = 500,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    if days < 0:
+        raise HTTPException(status_code=400, detail="days cannot be negative")
+    return stock.expiring_soon(db, days, location, include_expired, limit)
+
+@app.get("/inventory/forecast", response_model=schemas.DemandForecast)
+def read_demand_forecast(
+    horizon_weeks: int = 4,
+    window_weeks: int = 8,
+    item_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    if not 1 <= horizon_weeks <= 26:
+        raise HTTPException(status_code=400, detail="horizon_weeks must be between 1 and 26")
+    if not 1 <= window_weeks <= 52:
+        raise HTTPException(status_code=400, detail="window_weeks must be between 1 and 52")
+    return forecast.suggest_orders(db, horizon_weeks, window_weeks, item_id)
+
+@app.get("/inventory/movements", response_model=List[schemas.StockMovement])
+def read_stock_movements(
+    item_id: Optional[int] = None,
+    order_id: Optional[int] = None,
+    food_box_id: Optional[int] = None,
+    reason: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    names = serialization.field_names(schemas.StockMovement, fields)
+    query = serialization.select_for(schemas.StockMovement, models.StockMovement, names)
+    if item_id:
+        query = query.filter(models.StockMovement.item_id == item_id)
+    if order_id:
+        query = query.filter(models.StockMovement.order_id == order_id)
+    if food_box_id:
+        query = query.filter(models.StockMovement.food_box_id == food_box_id)
+    if reason:
+        query = query.filter(models.StockMovement.reason == reason)
+    movements = db.execute(paginate(query, models.StockMovement.id, skip, limit, cursor)).all()
+    return serialization.rows_response(movements, schemas.StockMovement, limit, names)
 
 # User/Volunteer endpoints
 @app.get("/users/", response_model=List[schemas.User])
-async def read_users(
+def read_users(
+    response: Response,
     role: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(User)
     if role:
         query = query.filter(User.role == role)
-    users = query.offset(skip).limit(limit).all()
-    return users
+    users = paginate(query, User.id, skip, limit, cursor).all()
+    return set_next_cursor(response, users, limit)
 
 @app.put("/users/{user_id}", response_model=schemas.User)
-async def update_user(
+def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
+    previous_email = db_user.email
     for field, value in user_update.dict(exclude_unset=True).items():
         setattr(db_user, field, value)
     
     db.commit()
     db.refresh(db_user)
+    auth.invalidate_principal(previous_email)
+    auth.invalidate_principal(db_user.email)
     return db_user
 
+@app.get("/users/{user_id}/conflicts", response_model=List[schemas.AssignmentConflict])
+def read_user_conflicts(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    if db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return conflicts.user_conflicts(db, user_id)
+
 # Rota endpoints
 @app.post("/rotas/", response_model=schemas.Rota)
-async def create_rota(
+def create_rota(
     rota: schemas.RotaCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_rota = models.Rota(**rota.dict())
     db.add(db_rota)
@@ -404,83 +589,141 @@ async def create_rota(
     return db_rota
 
 @app.get("/rotas/", response_model=List[schemas.Rota])
-async def read_rotas(
+def read_rotas(
+    response: Response,
     rota_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user),
+    validators: http_cache.Validators = Depends(http_cache.conditional("rotas"))
 ):
     query = db.query(models.Rota)
     if rota_type:
         query = query.filter(models.Rota.rota_type == rota_type)
-    rotas = query.offset(skip).limit(limit).all()
-    return rotas
+    rotas = paginate(query, models.Rota.id, skip, limit, cursor).all()
+    validators.apply(response)
+    return set_next_cursor(response, rotas, limit)
 
 @app.get("/rotas/{rota_id}", response_model=schemas.Rota)
-async def read_rota(
+def read_rota(
     rota_id: int,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user),
+    validators: http_cache.Validators = Depends(http_cache.conditional("rotas"))
 ):
     rota = db.query(models.Rota).filter(models.Rota.id == rota_id).first()
     if rota is None:
         raise HTTPException(status_code=404, detail="Rota not found")
+    validators.apply(response)
     return rota
 
+@app.post("/rotas/{rota_id}/schedule", response_model=schemas.RotaScheduleResult)
+def schedule_rota(
+    rota_id: int,
+    request: schemas.RotaScheduleRequest,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_user_role([UserRole.COORDINATOR, UserRole.ROTA_MANAGER]))
+):
+    rota = db.query(models.Rota).filter(models.Rota.id == rota_id).first()
+    if rota is None:
+        raise HTTPException(status_code=404, detail="Rota not found")
+    if not request.slots or any(slot.per_week < 1 for slot in request.slots):
+        raise HTTPException(status_code=400, detail="Each slot needs per_week of at least 1")
+    if request.min_gap_weeks < 0:
+        raise HTTPException(status_code=400, detail="min_gap_weeks cannot be negative")
+    return scheduler.schedule(
+        db,
+        rota,
+        [slot.dict() for slot in request.slots],
+        [entry.dict() for entry in request.unavailable],
+        max_per_user=request.max_per_user,
+        min_gap_weeks=request.min_gap_weeks,
+        replace=request.replace,
+        dry_run=request.dry_run,
+    )
+
 # Rota Assignment endpoints
+def _reject_rota_conflict(db: Session, db_assignment: models.RotaAssignment):
+    conflict = conflicts.rota_conflict(
+        db, db_assignment.user_id, db_assignment.week_start, db_assignment.week_end, exclude_id=db_assignment.id
+    )
+    if conflict is not None:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"User {conflict.user_id} is already assigned from {conflict.week_start:%Y-%m-%d} "
+                   f"to {conflict.week_end:%Y-%m-%d} (rota assignment {conflict.id})",
+        )
+
 @app.post("/rota-assignments/", response_model=schemas.RotaAssignment)
-async def create_rota_assignment(
+def create_rota_assignment(
     assignment: schemas.RotaAssignmentCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_assignment = models.RotaAssignment(**assignment.dict())
     db.add(db_assignment)
+    # Checked after the flush, which takes the write lock, so two concurrent
+    # requests cannot both pass the check.
+    db.flush()
+    _reject_rota_conflict(db, db_assignment)
     db.commit()
     db.refresh(db_assignment)
     return db_assignment
 
 @app.get("/rota-assignments/", response_model=List[schemas.RotaAssignment])
-async def read_rota_assignments(
+def read_rota_assignments(
+    response: Response,
     rota_id: Optional[int] = None,
     user_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.RotaAssignment)
     if rota_id:
         query = query.filter(models.RotaAssignment.rota_id == rota_id)
     if user_id:
         query = query.filter(models.RotaAssignment.user_id == user_id)
-    assignments = query.offset(skip).limit(limit).all()
-    return assignments
+    assignments = paginate(query, models.RotaAssignment.id, skip, limit, cursor).all()
+    return set_next_cursor(response, assignments, limit)
 
 @app.put("/rota-assignments/{assignment_id}", response_model=schemas.RotaAssignment)
-async def update_rota_assignment(
+def update_rota_assignment(
     assignment_id: int,
     assignment_update: schemas.RotaAssignmentUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_assignment = db.query(models.RotaAssignment).filter(models.RotaAssignment.id == assignment_id).first()
     if db_assignment is None:
         raise HTTPException(status_code=404, detail="Rota assignment not found")
     
-    for field, value in assignment_update.dict(exclude_unset=True).items():
+    update_data = assignment_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
         setattr(db_assignment, field, value)
+    if "week_start" in update_data or "week_end" in update_data:
+        # Checked again here, since the update may change only one end.
+        if db_assignment.week_end < db_assignment.week_start:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="week_end cannot be before week_start")
+        db.flush()
+        _reject_rota_conflict(db, db_assignment)
     
     db.commit()
     db.refresh(db_assignment)
     return db_assignment
 
 @app.delete("/rota-assignments/{assignment_id}")
-async def delete_rota_assignment(
+def delete_rota_assignment(
     assignment_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_assignment = db.query(models.RotaAssignment).filter(models.RotaAssignment.id == assignment_id).first()
     if db_assignment is None:
@@ -492,39 +735,68 @@ async def delete_rota_assignment(
 
 # Order endpoints
 @app.post("/orders/", response_model=schemas.Order)
-async def create_order(
+def create_order(
     order: schemas.OrderCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_order = models.Order(**order.dict())
     db.add(db_order)
+    db.flush()
+    spend.order_written(db, db_order)
     db.commit()
     db.refresh(db_order)
     return db_order
 
 @app.get("/orders/", response_model=List[schemas.Order])
-async def read_orders(
+def read_orders(
     order_type: Optional[str] = None,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
-    query = db.query(models.Order)
+    names = serialization.field_names(schemas.Order, fields)
+    query = serialization.select_for(schemas.Order, models.Order, names)
     if order_type:
         query = query.filter(models.Order.order_type == order_type)
     if status:
         query = query.filter(models.Order.status == status)
-    orders = query.offset(skip).limit(limit).all()
-    return orders
+    orders = db.execute(paginate(query, models.Order.id, skip, limit, cursor)).all()
+    return serialization.rows_response(orders, schemas.Order, limit, names)
+
+@app.get("/orders/spend", response_model=List[schemas.OrderSpend])
+def read_order_spend(
+    supplier: Optional[str] = None,
+    order_type: Optional[str] = None,
+    month_from: Optional[datetime] = None,
+    month_to: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    # Served from order_spend_summary, which is maintained on every order and
+    # order item write; cancelled orders are not counted.
+    summary = models.OrderSpendSummary
+    query = serialization.select_for(schemas.OrderSpend, summary)
+    if supplier:
+        query = query.filter(summary.supplier == supplier)
+    if order_type:
+        query = query.filter(summary.order_type == order_type)
+    if month_from:
+        query = query.filter(summary.month_start >= spend.month_start(month_from))
+    if month_to:
+        query = query.filter(summary.month_start <= month_to)
+    rows = db.execute(query.order_by(summary.month_start, summary.supplier, summary.order_type)).all()
+    return serialization.rows_response(rows, schemas.OrderSpend)
 
 @app.get("/orders/{order_id}", response_model=schemas.Order)
-async def read_order(
+def read_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     order = db.query(models.Order).filter(models.Order.id == order_id).first()
     if order is None:
@@ -532,70 +804,100 @@ async def read_order(
     return order
 
 @app.put("/orders/{order_id}", response_model=schemas.Order)
-async def update_order(
+def update_order(
     order_id: int,
     order_update: schemas.OrderUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    previous_key = spend.spend_key(db_order)
+    previous_status = db_order.status
     for field, value in order_update.dict(exclude_unset=True).items():
         setattr(db_order, field, value)
+    db.flush()
+    spend.order_written(db, db_order, previous_key)
+    ledger.order_status_changed(db, db_order, previous_status)
     
     db.commit()
     db.refresh(db_order)
     return db_order
 
 @app.delete("/orders/{order_id}")
-async def delete_order(
+def delete_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    previous_key = spend.spend_key(db_order)
     db.delete(db_order)
+    db.flush()
+    spend.refresh_spend(db, {previous_key})
     db.commit()
     return {"message": "Order deleted successfully"}
 
 # Order Item endpoints
 @app.post("/order-items/", response_model=schemas.OrderItem)
-async def create_order_item(
+def create_order_item(
     item: schemas.OrderItemCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_item = models.OrderItem(**item.dict())
     db.add(db_item)
+    db.flush()
+    spend.order_items_changed(db, [db_item.id])
+    ledger.order_lines_changed(db, [db_item.id])
     db.commit()
     db.refresh(db_item)
     return db_item
 
+@app.post("/order-items/bulk", response_model=schemas.BulkResult)
+async def bulk_order_items(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    rows = await bulk.read_rows(request)
+
+    def after_write(session, created, updated):
+        spend.order_items_changed(session, created + updated)
+        ledger.order_lines_changed(session, created + updated)
+
+    return await run_in_threadpool(
+        bulk.apply, db, models.OrderItem, schemas.OrderItemCreate, schemas.OrderItemUpdate, rows,
+        after_write=after_write,
+    )
+
 @app.get("/order-items/", response_model=List[schemas.OrderItem])
-async def read_order_items(
+def read_order_items(
+    response: Response,
     order_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.OrderItem)
     if order_id:
         query = query.filter(models.OrderItem.order_id == order_id)
-    items = query.offset(skip).limit(limit).all()
-    return items
+    items = paginate(query, models.OrderItem.id, skip, limit, cursor).all()
+    return set_next_cursor(response, items, limit)
 
 @app.put("/order-items/{item_id}", response_model=schemas.OrderItem)
-async def update_order_item(
+def update_order_item(
     item_id: int,
     item_update: schemas.OrderItemUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_item = db.query(models.OrderItem).filter(models.OrderItem.id == item_id).first()
     if db_item is None:
@@ -603,31 +905,37 @@ async def update_order_item(
     
     for field, value in item_update.dict(exclude_unset=True).items():
         setattr(db_item, field, value)
+    db.flush()
+    spend.order_items_changed(db, [db_item.id])
+    ledger.order_lines_changed(db, [db_item.id])
     
     db.commit()
     db.refresh(db_item)
     return db_item
 
 @app.delete("/order-items/{item_id}")
-async def delete_order_item(
+def delete_order_item(
     item_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_item = db.query(models.OrderItem).filter(models.OrderItem.id == item_id).first()
     if db_item is None:
         raise HTTPException(status_code=404, detail="Order item not found")
     
     db.delete(db_item)
+    db.flush()
+    spend.order_items_changed(db, order_ids=[db_item.order_id])
+    ledger.order_lines_changed(db, order_ids=[db_item.order_id])
     db.commit()
     return {"message": "Order item deleted successfully"}
 
 # Packing Session endpoints
 @app.post("/packing-sessions/", response_model=schemas.PackingSession)
-async def create_packing_session(
+def create_packing_session(
     session: schemas.PackingSessionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_session = models.PackingSession(**session.dict())
     db.add(db_session)
@@ -636,58 +944,218 @@ async def create_packing_session(
     return db_session
 
 @app.get("/packing-sessions/", response_model=List[schemas.PackingSession])
-async def read_packing_sessions(
+def read_packing_sessions(
+    response: Response,
     packing_list_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.PackingSession)
     if packing_list_id:
         query = query.filter(models.PackingSession.packing_list_id == packing_list_id)
-    sessions = query.offset(skip).limit(limit).all()
-    return sessions
+    sessions = paginate(query, models.PackingSession.id, skip, limit, cursor).all()
+    return set_next_cursor(response, sessions, limit)
+
+@app.put("/packing-sessions/{session_id}", response_model=schemas.PackingSession)
+def update_packing_session(
+    session_id: int,
+    session_update: schemas.PackingSessionUpdate,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    db_session = db.query(models.PackingSession).filter(models.PackingSession.id == session_id).first()
+    if db_session is None:
+        raise HTTPException(status_code=404, detail="Packing session not found")
+    
+    update_data = session_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_session, field, value)
+    if "scheduled_date" in update_data:
+        # Moving the session must not double-book any of its volunteers.
+        db.flush()
+        assignments = db.query(models.VolunteerAssignment.id, models.VolunteerAssignment.user_id).filter(
+            models.VolunteerAssignment.packing_session_id == session_id
+        ).all()
+        for assignment_id, user_id in assignments:
+            conflict = conflicts.session_conflict(db, user_id, db_session.scheduled_date, exclude_id=assignment_id)
+            if conflict is not None:
+                scheduled_date = db_session.scheduled_date
+                db.rollback()
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"User {user_id} is already volunteering on {scheduled_date:%Y-%m-%d} "
+                           f"(packing session {conflict.packing_session_id})",
+                )
+    
+    db.commit()
+    db.refresh(db_session)
+    events.session_changed(db_session)
+    return db_session
+
+@app.get("/packing-sessions/{session_id}/events")
+async def packing_session_events(
+    session_id: int,
+    current_user: schemas.Principal = Depends(auth.get_stream_user)
+):
+    # Server-sent events: a snapshot of the session and its box counts, then
+    # "food_boxes" and "session" events as they are committed, instead of
+    # polling /food-boxes/?packing_session_id=.
+    response = await events.session_stream(session_id)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Packing session not found")
+    return response
+
+@app.post("/packing-sessions/{session_id}/boxes")
+def create_packing_session_boxes(
+    session_id: int,
+    boxes_request: Optional[schemas.SessionBoxesCreate] = None,
+    format: str = "csv",
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_user_role([UserRole.COORDINATOR]))
+):
+    # Boxes every family of the session's agencies that has no box yet, with
+    # numbers from the session's sequence, then streams the session manifest.
+    # X-Boxes-Created carries how many boxes this request added.
+    if format not in exports.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be csv or ndjson")
+    session = db.get(models.PackingSession, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Packing session not found")
+    agency_ids = boxes_request.agency_ids if boxes_request is not None else None
+    food_box_ids = boxes.create_session_boxes(db, session, agency_ids)
+    db.commit()
+    events.food_box_ids_changed(db, food_box_ids)
+    # The manifest streams over its own connection; hand this one back first.
+    # The request's db_slots slot is held until the response ends and covers
+    # the stream, so it does not take another.
+    db.close()
+    return exports.stream_rows(
+        boxes.manifest_query(session_id), f"packing-session-{session_id}-manifest", format,
+        headers={"X-Boxes-Created": str(len(food_box_ids))}, admit=False,
+    )
+
+@app.get("/packing-sessions/{session_id}/manifest")
+def read_packing_session_manifest(
+    session_id: int,
+    format: str = "csv",
+    current_user: schemas.Principal = Depends(auth.get_stream_user)
+):
+    # Like /exports, no request session: the 404 check uses one that is closed
+    # before the stream opens its own connection.
+    with SessionLocal() as db:
+        found = db.get(models.PackingSession, session_id) is not None
+    if not found:
+        raise HTTPException(status_code=404, detail="Packing session not found")
+    return exports.stream_rows(boxes.manifest_query(session_id), f"packing-session-{session_id}-manifest", format)
+
+# Volunteer Assignment endpoints
+@app.post("/volunteer-assignments/", response_model=schemas.VolunteerAssignment)
+def create_volunteer_assignment(
+    assignment: schemas.VolunteerAssignmentCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    session = db.get(models.PackingSession, assignment.packing_session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Packing session not found")
+    db_assignment = models.VolunteerAssignment(**assignment.dict())
+    db.add(db_assignment)
+    db.flush()
+    conflict = conflicts.session_conflict(db, assignment.user_id, session.scheduled_date, exclude_id=db_assignment.id)
+    if conflict is not None:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"User {assignment.user_id} is already volunteering on {session.scheduled_date:%Y-%m-%d} "
+                   f"(packing session {conflict.packing_session_id})",
+        )
+    db.commit()
+    db.refresh(db_assignment)
+    return db_assignment
+
+@app.get("/volunteer-assignments/", response_model=List[schemas.VolunteerAssignment])
+def read_volunteer_assignments(
+    response: Response,
+    packing_session_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    query = db.query(models.VolunteerAssignment)
+    if packing_session_id:
+        query = query.filter(models.VolunteerAssignment.packing_session_id == packing_session_id)
+    if user_id:
+        query = query.filter(models.VolunteerAssignment.user_id == user_id)
+    assignments = paginate(query, models.VolunteerAssignment.id, skip, limit, cursor).all()
+    return set_next_cursor(response, assignments, limit)
 
 # Food Box endpoints
 @app.post("/food-boxes/", response_model=schemas.FoodBox)
-async def create_food_box(
+def create_food_box(
     food_box: schemas.FoodBoxCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_food_box = models.FoodBox(**food_box.dict())
     db.add(db_food_box)
+    db.flush()
+    ledger.boxes_packed(db, [db_food_box.id])
     db.commit()
     db.refresh(db_food_box)
+    events.food_boxes_changed([db_food_box])
     return db_food_box
 
+@app.post("/food-boxes/bulk", response_model=schemas.BulkResult)
+async def bulk_food_boxes(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_active_user)
+):
+    rows = await bulk.read_rows(request)
+    result = await run_in_threadpool(
+        bulk.apply, db, models.FoodBox, schemas.FoodBoxCreate, schemas.FoodBoxUpdate, rows,
+        after_write=lambda session, created, updated: ledger.boxes_packed(session, created),
+    )
+    if events.broker.has_subscribers():
+        ids = [row["id"] for row in result["results"] if "id" in row]
+        await run_in_threadpool(events.food_box_ids_changed, db, ids)
+    return result
+
 @app.get("/food-boxes/", response_model=List[schemas.FoodBox])
-async def read_food_boxes(
+def read_food_boxes(
     family_id: Optional[int] = None,
     packing_session_id: Optional[int] = None,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
-    query = db.query(models.FoodBox)
+    names = serialization.field_names(schemas.FoodBox, fields)
+    query = serialization.select_for(schemas.FoodBox, models.FoodBox, names)
     if family_id:
         query = query.filter(models.FoodBox.family_id == family_id)
     if packing_session_id:
         query = query.filter(models.FoodBox.packing_session_id == packing_session_id)
     if status:
         query = query.filter(models.FoodBox.status == status)
-    food_boxes = query.offset(skip).limit(limit).all()
-    return food_boxes
+    food_boxes = db.execute(paginate(query, models.FoodBox.id, skip, limit, cursor)).all()
+    return serialization.rows_response(food_boxes, schemas.FoodBox, limit, names)
 
 @app.put("/food-boxes/{food_box_id}", response_model=schemas.FoodBox)
-async def update_food_box(
+def update_food_box(
     food_box_id: int,
     food_box_update: schemas.FoodBoxUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_food_box = db.query(models.FoodBox).filter(models.FoodBox.id == food_box_id).first()
     if db_food_box is None:
@@ -698,14 +1166,42 @@ async def update_food_box(
     
     db.commit()
     db.refresh(db_food_box)
+    events.food_boxes_changed([db_food_box])
     return db_food_box
 
+# Export endpoints
+@app.get("/exports/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: str = "csv",
+    current_user: schemas.Principal = Depends(get_current_user_role([UserRole.COORDINATOR], stream=True))
+):
+    # Streams rows over its own connection, so no request session is needed.
+    return exports.stream_export(dataset, format)
+
+# Import endpoints
+@app.post("/imports/{dataset}", response_model=schemas.ImportResult)
+def import_dataset(
+    dataset: str,
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(get_current_user_role([UserRole.COORDINATOR]))
+):
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return imports.import_csv(db, dataset, stream, dry_run=dry_run)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    finally:
+        stream.detach()
+
 # Communication endpoints
 @app.post("/communications/", response_model=schemas.Communication)
-async def create_communication(
+def create_communication(
     communication: schemas.CommunicationCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_communication = models.Communication(**communication.dict())
     db.add(db_communication)
@@ -714,25 +1210,27 @@ async def create_communication(
     return db_communication
 
 @app.get("/communications/", response_model=List[schemas.Communication])
-async def read_communications(
+def read_communications(
+    response: Response,
     recipient_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.Communication)
     if recipient_type:
         query = query.filter(models.Communication.recipient_type == recipient_type)
-    communications = query.offset(skip).limit(limit).all()
-    return communications
+    communications = paginate(query, models.Communication.id, skip, limit, cursor).all()
+    return set_next_cursor(response, communications, limit)
 
 # Weekly Requirements endpoints
 @app.post("/weekly-requirements/", response_model=schemas.WeeklyRequirement)
-async def create_weekly_requirement(
+def create_weekly_requirement(
     requirement: schemas.WeeklyRequirementCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_requirement = models.WeeklyRequirement(**requirement.dict())
     db.add(db_requirement)
@@ -741,28 +1239,30 @@ async def create_weekly_requirement(
     return db_requirement
 
 @app.get("/weekly-requirements/", response_model=List[schemas.WeeklyRequirement])
-async def read_weekly_requirements(
+def read_weekly_requirements(
+    response: Response,
     agency_id: Optional[int] = None,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.WeeklyRequirement)
     if agency_id:
         query = query.filter(models.WeeklyRequirement.agency_id == agency_id)
     if status:
         query = query.filter(models.WeeklyRequirement.status == status)
-    requirements = query.offset(skip).limit(limit).all()
-    return requirements
+    requirements = paginate(query, models.WeeklyRequirement.id, skip, limit, cursor).all()
+    return set_next_cursor(response, requirements, limit)
 
 @app.put("/weekly-requirements/{requirement_id}", response_model=schemas.WeeklyRequirement)
-async def update_weekly_requirement(
+def update_weekly_requirement(
     requirement_id: int,
     requirement_update: schemas.WeeklyRequirementUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_requirement = db.query(models.WeeklyRequirement).filter(models.WeeklyRequirement.id == requirement_id).first()
     if db_requirement is None:
@@ -776,10 +1276,10 @@ async def update_weekly_requirement(
     return db_requirement
 
 @app.delete("/weekly-requirements/{requirement_id}")
-async def delete_weekly_requirement(
+def delete_weekly_requirement(
     requirement_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_requirement = db.query(models.WeeklyRequirement).filter(models.WeeklyRequirement.id == requirement_id).first()
     if db_requirement is None:
@@ -791,10 +1291,10 @@ async def delete_weekly_requirement(
 
 # Communication Template endpoints
 @app.post("/communication-templates/", response_model=schemas.CommunicationTemplate)
-async def create_communication_template(
+def create_communication_template(
     template: schemas.CommunicationTemplateCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_template = models.CommunicationTemplate(**template.dict())
     db.add(db_template)
@@ -803,28 +1303,30 @@ async def create_communication_template(
     return db_template
 
 @app.get("/communication-templates/", response_model=List[schemas.CommunicationTemplate])
-async def read_communication_templates(
+def read_communication_templates(
+    response: Response,
     recipient_type: Optional[str] = None,
     communication_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     query = db.query(models.CommunicationTemplate)
     if recipient_type:
         query = query.filter(models.CommunicationTemplate.recipient_type == recipient_type)
     if communication_type:
         query = query.filter(models.CommunicationTemplate.communication_type == communication_type)
-    templates = query.offset(skip).limit(limit).all()
-    return templates
+    templates = paginate(query, models.CommunicationTemplate.id, skip, limit, cursor).all()
+    return set_next_cursor(response, templates, limit)
 
 @app.put("/communication-templates/{template_id}", response_model=schemas.CommunicationTemplate)
-async def update_communication_template(
+def update_communication_template(
     template_id: int,
     template_update: schemas.CommunicationTemplateUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_template = db.query(models.CommunicationTemplate).filter(models.CommunicationTemplate.id == template_id).first()
     if db_template is None:
@@ -838,10 +1340,10 @@ async def update_communication_template(
     return db_template
 
 @app.delete("/communication-templates/{template_id}")
-async def delete_communication_template(
+def delete_communication_template(
     template_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: schemas.Principal = Depends(get_current_active_user)
 ):
     db_template = db.query(models.CommunicationTemplate).filter(models.CommunicationTemplate.id == template_id).first()
     if db_template is None:
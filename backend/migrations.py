@@ -0,0 +1,299 @@
+"""
+Versioned schema migrations.
+
+Each migration is a function registered with ``@migration(version, name)`` that
+receives a connection inside its own transaction. Applied versions are recorded
+in the ``schema_migrations`` table, so ``upgrade`` only runs what is missing.
+
+Migrations must be idempotent (create with ``checkfirst``, inspect before
+altering): databases created by the old ``create_all`` call already contain some
+of the objects a migration adds.
+
+Usage:
+    python -m backend.migrations upgrade
+    python -m backend.migrations status
+"""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, Integer, MetaData, String, Table, Text, bindparam, column, delete, func,
+    insert, select, table, update,
+)
+# Imported for its side effect: the models register their tables on
+# Base.metadata, which _create_tables and _create_indexes read.
+import backend.models  # noqa: F401
+from backend.database import Base, engine as default_engine
+from collections import defaultdict
+from datetime import datetime
+import json
+import sys
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+MIGRATIONS = []
+
+def migration(version: int, name: str):
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+def _create_tables(conn, *names):
+    for name in names:
+        Base.metadata.tables[name].create(conn, checkfirst=True)
+
+def _create_indexes(conn, *names):
+    indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+@migration(1, "initial schema")
+def _initial_schema(conn):
+    _create_tables(
+        conn,
+        "users", "agencies", "families", "items", "inventory_items",
+        "weekly_requirements", "packing_lists", "packing_list_items",
+        "packing_sessions", "volunteer_assignments", "food_boxes", "orders",
+        "order_items", "rotas", "rota_assignments", "communications",
+    )
+
+@migration(2, "foreign key and list filter indexes")
+def _list_filter_indexes(conn):
+    _create_indexes(
+        conn,
+        "ix_users_role_id",
+        "ix_families_agency_id_id",
+        "ix_items_category_id",
+        "ix_inventory_items_item_id",
+        "ix_weekly_requirements_agency_id_status_id",
+        "ix_weekly_requirements_status_id",
+        "ix_packing_list_items_packing_list_id_id",
+        "ix_packing_sessions_packing_list_id_id",
+        "ix_volunteer_assignments_packing_session_id",
+        "ix_volunteer_assignments_user_id",
+        "ix_food_boxes_family_id_id",
+        "ix_food_boxes_packing_session_id_status_id",
+        "ix_food_boxes_status_id",
+        "ix_orders_order_type_status_id",
+        "ix_orders_status_id",
+        "ix_order_items_order_id_id",
+        "ix_rotas_rota_type_id",
+        "ix_rota_assignments_rota_id_user_id_id",
+        "ix_rota_assignments_user_id_id",
+        "ix_communications_recipient_type_id",
+    )
+
+@migration(3, "weekly requirement week lookup index")
+def _requirement_week_index(conn):
+    _create_indexes(conn, "ix_weekly_requirements_status_week_start")
+
+# Data backfills below use their own table() definitions and logic rather
+# than the application's models and modules, so later changes to those do not
+# change what an old migration does.
+
+def _seed_table_versions(conn, *names):
+    versions = table(
+        "table_versions",
+        column("table_name", String), column("version", Integer), column("updated_at", DateTime),
+    )
+    existing = set(conn.execute(select(versions.c.table_name)).scalars())
+    now = datetime.utcnow()
+    rows = [{"table_name": name, "version": 1, "updated_at": now} for name in sorted(set(names) - existing)]
+    if rows:
+        conn.execute(insert(versions), rows)
+
+@migration(4, "materialized item stock levels")
+def _item_stock_levels(conn):
+    _create_tables(conn, "item_stock_levels")
+    inventory = table(
+        "inventory_items",
+        column("item_id", Integer), column("location", String), column("quantity", Float),
+        column("min_quantity", Float), column("max_quantity", Float), column("expiry_date", DateTime),
+    )
+    levels_table = table(
+        "item_stock_levels",
+        column("item_id", Integer), column("total_quantity", Float), column("min_quantity", Float),
+        column("max_quantity", Float), column("earliest_expiry", DateTime), column("batch_count", Integer),
+        column("locations", Text), column("below_min", Boolean),
+    )
+    levels = {}
+    for item_id, location, quantity, min_quantity, max_quantity, expiry, batches in conn.execute(
+        select(
+            inventory.c.item_id, inventory.c.location, func.sum(inventory.c.quantity),
+            func.max(inventory.c.min_quantity), func.max(inventory.c.max_quantity),
+            func.min(inventory.c.expiry_date), func.count(),
+        ).group_by(inventory.c.item_id, inventory.c.location)
+    ):
+        level = levels.setdefault(item_id, {
+            "item_id": item_id, "total_quantity": 0.0, "min_quantity": 0.0, "max_quantity": None,
+            "earliest_expiry": None, "batch_count": 0, "locations": {},
+        })
+        quantity = quantity or 0.0
+        level["total_quantity"] += quantity
+        level["min_quantity"] = max(level["min_quantity"], min_quantity or 0.0)
+        if max_quantity is not None:
+            level["max_quantity"] = max(level["max_quantity"] or 0.0, max_quantity)
+        if expiry is not None and (level["earliest_expiry"] is None or expiry < level["earliest_expiry"]):
+            level["earliest_expiry"] = expiry
+        level["batch_count"] += batches
+        key = location or "unassigned"
+        level["locations"][key] = level["locations"].get(key, 0.0) + quantity
+    for level in levels.values():
+        level["below_min"] = level["total_quantity"] < level["min_quantity"]
+        level["locations"] = json.dumps(level["locations"], sort_keys=True)
+    conn.execute(delete(levels_table))
+    if levels:
+        conn.execute(insert(levels_table), list(levels.values()))
+
+@migration(5, "shared table versions")
+def _table_versions(conn):
+    _create_tables(conn, "table_versions")
+    _seed_table_versions(conn, "items", "agencies", "rotas")
+
+@migration(6, "assignment conflict indexes")
+def _assignment_conflict_indexes(conn):
+    _create_indexes(
+        conn,
+        "ix_rota_assignments_user_id_week_end",
+        "ix_packing_sessions_scheduled_date",
+        "ix_volunteer_assignments_packing_session_id_user_id",
+    )
+
+@migration(7, "server-side order totals and spend summary")
+def _order_spend_summary(conn):
+    _create_tables(conn, "order_spend_summary")
+    _create_indexes(conn, "ix_orders_supplier_order_type_order_date")
+    order_items = table(
+        "order_items",
+        column("id", Integer), column("order_id", Integer), column("quantity", Float),
+        column("unit_price", Float), column("total_price", Float),
+    )
+    orders = table(
+        "orders",
+        column("id", Integer), column("supplier", String), column("order_type", String),
+        column("order_date", DateTime), column("status", String), column("total_cost", Float),
+    )
+    summary = table(
+        "order_spend_summary",
+        column("supplier", String), column("order_type", String), column("month_start", DateTime),
+        column("order_count", Integer), column("total_cost", Float),
+    )
+
+    # A line with a unit price is quantity * unit_price; one without keeps
+    # its entered lump sum.
+    line_totals = [
+        {"line_id": line_id, "total": round(quantity * unit_price, 2)}
+        for line_id, quantity, unit_price, total_price in conn.execute(
+            select(order_items.c.id, order_items.c.quantity, order_items.c.unit_price, order_items.c.total_price)
+            .where(order_items.c.unit_price.is_not(None), order_items.c.quantity.is_not(None))
+        )
+        if round(quantity * unit_price, 2) != total_price
+    ]
+    if line_totals:
+        conn.execute(
+            update(order_items).where(order_items.c.id == bindparam("line_id")).values(total_price=bindparam("total")),
+            line_totals,
+        )
+
+    # Orders with lines total them; orders without keep the total entered.
+    order_totals = [
+        {"order_key": order_id, "total": round(total or 0.0, 2)}
+        for order_id, total in conn.execute(
+            select(order_items.c.order_id, func.sum(order_items.c.total_price)).group_by(order_items.c.order_id)
+        )
+    ]
+    if order_totals:
+        conn.execute(
+            update(orders).where(orders.c.id == bindparam("order_key")).values(total_cost=bindparam("total")),
+            order_totals,
+        )
+
+    # Enum columns store the member name.
+    spend = defaultdict(lambda: [0, 0.0])
+    for supplier, order_type, order_date, total_cost in conn.execute(
+        select(orders.c.supplier, orders.c.order_type, orders.c.order_date, orders.c.total_cost)
+        .where(orders.c.status != "CANCELLED")
+    ):
+        entry = spend[supplier, order_type, datetime(order_date.year, order_date.month, 1)]
+        entry[0] += 1
+        entry[1] += total_cost or 0.0
+    conn.execute(delete(summary))
+    if spend:
+        conn.execute(insert(summary), [
+            {"supplier": supplier, "order_type": order_type, "month_start": month,
+             "order_count": count, "total_cost": round(total, 2)}
+            for (supplier, order_type, month), (count, total) in spend.items()
+        ])
+
+@migration(8, "stock movement ledger")
+def _stock_movements(conn):
+    _create_tables(conn, "stock_movements")
+    _create_indexes(conn, "ix_inventory_items_item_id_expiry_date")
+
+@migration(9, "inventory expiry index")
+def _inventory_expiry_index(conn):
+    _create_indexes(conn, "ix_inventory_items_expiry_date")
+
+@migration(10, "forecast history indexes")
+def _forecast_history_indexes(conn):
+    _create_indexes(conn, "ix_packing_lists_week_start", "ix_weekly_requirements_week_start")
+
+@migration(11, "box number sequences")
+def _box_number_sequences(conn):
+    _create_tables(conn, "box_number_sequences")
+
+@migration(12, "forecast history table versions")
+def _forecast_table_versions(conn):
+    # Rows for the tables backend.forecast keys its caches on, so the first
+    # writes to them only ever update (two concurrent inserts would clash).
+    _seed_table_versions(conn, "packing_lists", "packing_list_items", "weekly_requirements")
+
+@migration(13, "dashboard table versions")
+def _dashboard_table_versions(conn):
+    _seed_table_versions(
+        conn, "families", "item_stock_levels", "packing_sessions", "food_boxes", "orders", "users",
+    )
+
+def applied_versions(engine=default_engine):
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def upgrade(engine=default_engine):
+    applied = applied_versions(engine)
+    ran = []
+    for version, name, func in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            func(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name))
+        ran.append((version, name))
+    return ran
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "upgrade"
+    if command == "upgrade":
+        ran = upgrade()
+        for version, name in ran:
+            print(f"Applied {version:04d} {name}")
+        if not ran:
+            print("Database is up to date.")
+    elif command == "status":
+        applied = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            print(f"[{'x' if version in applied else ' '}] {version:04d} {name}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,9 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.database import Base
 import enum
-from datetime import datetime
 
 class UserRole(str, enum.Enum):
     AGENCY = "agency"
@@ -34,6 +33,9 @@ class PackingStatus(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_id", "role", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -63,6 +65,9 @@ class Agency(Base):
 
 class Family(Base):
     __tablename__ = "families"
+    __table_args__ = (
+        Index("ix_families_agency_id_id", "agency_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     agency_id = Column(Integer, ForeignKey("agencies.id"), nullable=False)
@@ -81,6 +86,9 @@ class Family(Base):
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        Index("ix_items_category_id", "category", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -96,6 +104,11 @@ class Item(Base):
 
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
+    __table_args__ = (
+        Index("ix_inventory_items_item_id", "item_id"),
+        Index("ix_inventory_items_item_id_expiry_date", "item_id", "expiry_date"),
+        Index("ix_inventory_items_expiry_date", "expiry_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
@@ -109,8 +122,65 @@ class InventoryItem(Base):
     
     item = relationship("Item", back_populates="inventory_items")
 
+class StockMovement(Base):
+    # Append-only ledger of inventory changes, written by backend.ledger in
+    # the same transaction as the change. balance_after is the item's total
+    # stock once the movement was applied.
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index("ix_stock_movements_item_id_id", "item_id", "id"),
+        Index("ix_stock_movements_reason_id", "reason", "id"),
+        Index("ix_stock_movements_order_id", "order_id"),
+        Index("ix_stock_movements_food_box_id", "food_box_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"))
+    quantity_delta = Column(Float, nullable=False)
+    balance_after = Column(Float, nullable=False)
+    reason = Column(String, nullable=False)  # received, delivery, delivery_reversed, packed
+    order_id = Column(Integer, ForeignKey("orders.id"))
+    food_box_id = Column(Integer, ForeignKey("food_boxes.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ItemStockLevel(Base):
+    # Per-item aggregate of inventory_items, kept up to date by backend.stock
+    # whenever inventory is written.
+    __tablename__ = "item_stock_levels"
+    __table_args__ = (
+        Index("ix_item_stock_levels_below_min_item_id", "below_min", "item_id"),
+    )
+    
+    item_id = Column(Integer, ForeignKey("items.id"), primary_key=True)
+    total_quantity = Column(Float, nullable=False, default=0)
+    min_quantity = Column(Float, nullable=False, default=0)
+    max_quantity = Column(Float)
+    earliest_expiry = Column(DateTime)
+    batch_count = Column(Integer, nullable=False, default=0)
+    locations = Column(Text)  # JSON object of location -> quantity
+    below_min = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    item = relationship("Item")
+
+class TableVersion(Base):
+    # Shared change counter per table, bumped by backend.changes in the same
+    # transaction as the write so every worker process sees it.
+    __tablename__ = "table_versions"
+    
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
 class WeeklyRequirement(Base):
     __tablename__ = "weekly_requirements"
+    __table_args__ = (
+        Index("ix_weekly_requirements_agency_id_status_id", "agency_id", "status", "id"),
+        Index("ix_weekly_requirements_status_id", "status", "id"),
+        Index("ix_weekly_requirements_status_week_start", "status", "week_start"),
+        Index("ix_weekly_requirements_week_start", "week_start"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     agency_id = Column(Integer, ForeignKey("agencies.id"), nullable=False)
@@ -127,6 +197,9 @@ class WeeklyRequirement(Base):
 
 class PackingList(Base):
     __tablename__ = "packing_lists"
+    __table_args__ = (
+        Index("ix_packing_lists_week_start", "week_start"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     week_start = Column(DateTime, nullable=False)
@@ -141,6 +214,9 @@ class PackingList(Base):
 
 class PackingListItem(Base):
     __tablename__ = "packing_list_items"
+    __table_args__ = (
+        Index("ix_packing_list_items_packing_list_id_id", "packing_list_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     packing_list_id = Column(Integer, ForeignKey("packing_lists.id"), nullable=False)
@@ -154,6 +230,10 @@ class PackingListItem(Base):
 
 class PackingSession(Base):
     __tablename__ = "packing_sessions"
+    __table_args__ = (
+        Index("ix_packing_sessions_packing_list_id_id", "packing_list_id", "id"),
+        Index("ix_packing_sessions_scheduled_date", "scheduled_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     packing_list_id = Column(Integer, ForeignKey("packing_lists.id"), nullable=False)
@@ -168,6 +248,11 @@ class PackingSession(Base):
 
 class VolunteerAssignment(Base):
     __tablename__ = "volunteer_assignments"
+    __table_args__ = (
+        Index("ix_volunteer_assignments_packing_session_id", "packing_session_id"),
+        Index("ix_volunteer_assignments_user_id", "user_id"),
+        Index("ix_volunteer_assignments_packing_session_id_user_id", "packing_session_id", "user_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     packing_session_id = Column(Integer, ForeignKey("packing_sessions.id"), nullable=False)
@@ -182,6 +267,11 @@ class VolunteerAssignment(Base):
 
 class FoodBox(Base):
     __tablename__ = "food_boxes"
+    __table_args__ = (
+        Index("ix_food_boxes_family_id_id", "family_id", "id"),
+        Index("ix_food_boxes_packing_session_id_status_id", "packing_session_id", "status", "id"),
+        Index("ix_food_boxes_status_id", "status", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     family_id = Column(Integer, ForeignKey("families.id"), nullable=False)
@@ -197,8 +287,23 @@ class FoodBox(Base):
     family = relationship("Family", back_populates="food_boxes")
     packing_session = relationship("PackingSession")
 
+class BoxNumberSequence(Base):
+    # Last box number handed out per packing session, advanced by
+    # backend.boxes with a single UPDATE so concurrent requests get disjoint
+    # ranges.
+    __tablename__ = "box_number_sequences"
+    
+    packing_session_id = Column(Integer, ForeignKey("packing_sessions.id"), primary_key=True)
+    last_number = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_order_type_status_id", "order_type", "status", "id"),
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_supplier_order_type_order_date", "supplier", "order_type", "order_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     order_type = Column(String, nullable=False)  # weekly, monthly, quarterly, hygiene, special
@@ -215,8 +320,26 @@ class Order(Base):
     order_items = relationship("OrderItem", back_populates="order")
     creator = relationship("User")
 
+class OrderSpendSummary(Base):
+    # Total of non-cancelled orders per supplier, order type and month, kept
+    # up to date by backend.spend whenever orders or order items are written.
+    __tablename__ = "order_spend_summary"
+    __table_args__ = (
+        Index("ix_order_spend_summary_month_start", "month_start"),
+    )
+    
+    supplier = Column(String, primary_key=True)
+    order_type = Column(String, primary_key=True)
+    month_start = Column(DateTime, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    total_cost = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index("ix_order_items_order_id_id", "order_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
@@ -232,6 +355,9 @@ class OrderItem(Base):
 
 class Rota(Base):
     __tablename__ = "rotas"
+    __table_args__ = (
+        Index("ix_rotas_rota_type_id", "rota_type", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     rota_type = Column(String, nullable=False)  # packing, hygiene
@@ -245,6 +371,11 @@ class Rota(Base):
 
 class RotaAssignment(Base):
     __tablename__ = "rota_assignments"
+    __table_args__ = (
+        Index("ix_rota_assignments_rota_id_user_id_id", "rota_id", "user_id", "id"),
+        Index("ix_rota_assignments_user_id_id", "user_id", "id"),
+        Index("ix_rota_assignments_user_id_week_end", "user_id", "week_end", "week_start"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     rota_id = Column(Integer, ForeignKey("rotas.id"), nullable=False)
@@ -261,6 +392,9 @@ class RotaAssignment(Base):
 
 class Communication(Base):
     __tablename__ = "communications"
+    __table_args__ = (
+        Index("ix_communications_recipient_type_id", "recipient_type", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     subject = Column(String, nullable=False)
@@ -0,0 +1,131 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from backend import models, stock
+from backend.changes import mark_changed
+
+def confirmed_demand(db: Session, week_start: datetime, week_end: datetime):
+    # One aggregate over the (status, week_start) index: total boxes and the
+    # number of agencies with a confirmed requirement that week.
+    requirement = models.WeeklyRequirement
+    total_boxes, agencies = db.execute(
+        select(
+            func.coalesce(func.sum(requirement.total_boxes), 0),
+            func.count(func.distinct(requirement.agency_id)),
+        ).where(
+            requirement.status == "confirmed",
+            requirement.week_start >= week_start,
+            requirement.week_start <= week_end,
+        )
+    ).one()
+    return int(total_boxes), agencies
+
+def latest_template(db: Session):
+    # Per-box quantities from the most recent packing list.
+    latest = (
+        select(models.PackingList.id)
+        .order_by(models.PackingList.week_start.desc(), models.PackingList.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(models.PackingListItem.item_id, models.PackingListItem.quantity_per_box)
+        .where(models.PackingListItem.packing_list_id == latest)
+    )
+    return {item_id: quantity for item_id, quantity in rows}
+
+def generate(db: Session, week_start: datetime, week_end: datetime, template=None, dry_run: bool = False):
+    total_boxes, agencies = confirmed_demand(db, week_start, week_end)
+    if template is None:
+        template = latest_template(db)
+    # Expired batches are left out, as the pick list leaves them out.
+    available_stock = stock.usable_totals(db, list(template), stock.today())
+
+    items = []
+    for item_id, quantity_per_box in template.items():
+        needed = quantity_per_box * total_boxes
+        available = available_stock.get(item_id, 0.0)
+        items.append({
+            "item_id": item_id,
+            "quantity_per_box": quantity_per_box,
+            "total_quantity_needed": needed,
+            "available_quantity": available,
+            "shortfall": max(0.0, needed - available),
+        })
+
+    packing_list_id = None
+    if not dry_run:
+        packing_list = models.PackingList(week_start=week_start, week_end=week_end, total_boxes=total_boxes)
+        db.add(packing_list)
+        db.flush()
+        packing_list_id = packing_list.id
+        if items:
+            db.execute(insert(models.PackingListItem), [
+                {
+                    "packing_list_id": packing_list_id,
+                    "item_id": item["item_id"],
+                    "quantity_per_box": item["quantity_per_box"],
+                    "total_quantity_needed": item["total_quantity_needed"],
+                }
+                for item in items
+            ])
+            mark_changed(db, models.PackingListItem.__tablename__)
+        db.commit()
+
+    return {
+        "packing_list_id": packing_list_id,
+        "week_start": week_start,
+        "week_end": week_end,
+        "total_boxes": total_boxes,
+        "agencies": agencies,
+        "items": items,
+        "shortfall_items": sum(1 for item in items if item["shortfall"] > 0),
+    }
+
+def pick_list(db: Session, packing_list: models.PackingList, boxes: int = None):
+    # First-expiry-first-out picks for a packing list, grouped by location.
+    # One query for the lines and one for the in-date batches of all their
+    # items, already in FEFO order, then a single pass. For boxes, the
+    # per-box quantities are scaled instead of using total_quantity_needed.
+    usable_on = stock.today()
+    needed, names = defaultdict(float), {}
+    for item_id, name, quantity_per_box, total_quantity_needed in db.execute(
+        select(
+            models.PackingListItem.item_id, models.Item.name,
+            models.PackingListItem.quantity_per_box, models.PackingListItem.total_quantity_needed,
+        )
+        .join(models.Item, models.Item.id == models.PackingListItem.item_id)
+        .where(models.PackingListItem.packing_list_id == packing_list.id)
+        .order_by(models.PackingListItem.id)
+    ):
+        needed[item_id] += quantity_per_box * boxes if boxes is not None else total_quantity_needed
+        names[item_id] = name
+
+    batches = stock.fefo_batches(db, needed, usable_on=usable_on) if needed else {}
+    locations, shortfalls = defaultdict(list), []
+    for item_id, quantity in needed.items():
+        picks, shortfall = stock.allocate(batches.get(item_id, []), quantity)
+        for batch, amount in picks:
+            locations[batch.location or stock.UNASSIGNED_LOCATION].append({
+                "item_id": item_id,
+                "item_name": names[item_id],
+                "inventory_item_id": batch.id,
+                "quantity": amount,
+                "expiry_date": batch.expiry_date,
+            })
+        if shortfall > 0:
+            shortfalls.append({
+                "item_id": item_id,
+                "item_name": names[item_id],
+                "needed": quantity,
+                "available": quantity - shortfall,
+                "shortfall": shortfall,
+            })
+    return {
+        "packing_list_id": packing_list.id,
+        "boxes": boxes if boxes is not None else packing_list.total_boxes,
+        "usable_on": usable_on,
+        "locations": [{"location": location, "picks": locations[location]} for location in sorted(locations)],
+        "shortfalls": shortfalls,
+    }
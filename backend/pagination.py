@@ -0,0 +1,31 @@
+from fastapi import HTTPException, Response
+import base64
+import json
+
+# List endpoints return a plain JSON array, so the cursor for the next page
+# travels in a response header to stay compatible with existing clients.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return int(json.loads(raw)["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(query, id_column, skip: int, limit: int, cursor=None):
+    # With a cursor the page starts with an index seek on the primary key, so
+    # deep pages cost the same as the first one. skip/limit still works as before.
+    query = query.order_by(id_column)
+    if cursor:
+        return query.filter(id_column > decode_cursor(cursor)).limit(limit)
+    return query.offset(skip).limit(limit)
+
+def set_next_cursor(response: Response, rows, limit: int, key: str = "id"):
+    if limit and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(rows[-1], key))
+    return rows
@@ -0,0 +1,153 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from backend import models
+from backend.changes import mark_changed
+import heapq
+
+def rota_weeks(rota: models.Rota):
+    # Seven-day periods from quarter_start up to quarter_end.
+    weeks = []
+    start = rota.quarter_start
+    while start <= rota.quarter_end:
+        weeks.append((start, min(start + timedelta(days=6), rota.quarter_end)))
+        start += timedelta(days=7)
+    return weeks
+
+def _week_span(weeks, start: datetime, end: datetime):
+    # Indexes of the weeks that [start, end] overlaps.
+    return [index for index, (week_start, week_end) in enumerate(weeks) if start <= week_end and end >= week_start]
+
+class _Pool:
+    # Min-heap of eligible users ordered by (assignments so far, week of the
+    # last assignment, user id), so the least-used, longest-rested volunteer
+    # comes first. Entries go stale when a user's load changes in another pool;
+    # those are skipped on pop (lazy deletion) instead of re-heapifying.
+    def __init__(self, user_ids, load, last):
+        self.heap = [(load[user_id], last[user_id], user_id) for user_id in user_ids]
+        heapq.heapify(self.heap)
+
+    def push(self, user_id, load, last):
+        heapq.heappush(self.heap, (load[user_id], last[user_id], user_id))
+
+    def pop_valid(self, load, last):
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            if entry[0] == load[entry[2]] and entry[1] == last[entry[2]]:
+                return entry[2]
+        return None
+
+def schedule(db: Session, rota: models.Rota, slots, unavailable=(), max_per_user: int = None,
+             min_gap_weeks: int = 1, replace: bool = False, dry_run: bool = False):
+    # Hard constraints: one assignment per user per week (across all rotas),
+    # stated unavailability, at least min_gap_weeks weeks off between a user's
+    # assignments and at most max_per_user per quarter. Within those, each slot
+    # goes to the eligible user with the fewest assignments so far.
+    weeks = rota_weeks(rota)
+    never = -len(weeks) - min_gap_weeks - 1
+
+    if replace and not dry_run:
+        # Confirmed assignments are kept; everything else is rescheduled.
+        db.execute(
+            delete(models.RotaAssignment)
+            .where(models.RotaAssignment.rota_id == rota.id, models.RotaAssignment.confirmed.is_not(True))
+        )
+
+    eligible = {}
+    roles = {role for slot in slots for role in slot["eligible_roles"]}
+    for user_id, role in db.execute(
+        select(models.User.id, models.User.role)
+        .where(models.User.role.in_(roles), models.User.is_active.is_(True))
+        .order_by(models.User.id)
+    ):
+        eligible[user_id] = role
+
+    load = defaultdict(int)
+    last = defaultdict(lambda: never)
+    worked = defaultdict(set)    # user -> week indexes assigned in this rota
+    busy = defaultdict(set)      # week index -> users already working that week
+    filled = defaultdict(int)    # (week index, slot role) -> assignments already in this rota
+    if eligible:
+        existing = db.execute(
+            select(
+                models.RotaAssignment.rota_id, models.RotaAssignment.user_id, models.RotaAssignment.role,
+                models.RotaAssignment.week_start, models.RotaAssignment.week_end, models.RotaAssignment.confirmed,
+            ).where(
+                models.RotaAssignment.week_start <= rota.quarter_end,
+                models.RotaAssignment.week_end >= rota.quarter_start,
+            )
+        )
+        for rota_id, user_id, role, week_start, week_end, confirmed in existing:
+            if replace and rota_id == rota.id and not confirmed:
+                continue
+            for index in _week_span(weeks, week_start, week_end):
+                busy[index].add(user_id)
+                if rota_id == rota.id:
+                    filled[index, role] += 1
+                    load[user_id] += 1
+                    last[user_id] = max(last[user_id], index)
+                    worked[user_id].add(index)
+    for entry in unavailable:
+        for index in _week_span(weeks, entry["start"], entry["end"]):
+            busy[index].add(entry["user_id"])
+
+    pools, memberships = [], defaultdict(list)
+    for slot in slots:
+        members = [user_id for user_id, role in eligible.items() if role in slot["eligible_roles"]]
+        pool = _Pool(members, load, last)
+        pools.append(pool)
+        for user_id in members:
+            memberships[user_id].append(pool)
+
+    rows, unfilled = [], []
+    for index, (week_start, week_end) in enumerate(weeks):
+        for slot, pool in zip(slots, pools):
+            needed = slot["per_week"] - filled[index, slot["role"]]
+            skipped = []
+            while needed > 0:
+                user_id = pool.pop_valid(load, last)
+                if user_id is None:
+                    break
+                if (user_id in busy[index]
+                        or any(week in worked[user_id] for week in range(index - min_gap_weeks, index + min_gap_weeks + 1))
+                        or (max_per_user is not None and load[user_id] >= max_per_user)):
+                    skipped.append(user_id)
+                    continue
+                rows.append({
+                    "rota_id": rota.id, "user_id": user_id, "role": slot["role"],
+                    "week_start": week_start, "week_end": week_end, "confirmed": False,
+                })
+                busy[index].add(user_id)
+                load[user_id] += 1
+                last[user_id] = index
+                worked[user_id].add(index)
+                for member_pool in memberships[user_id]:
+                    member_pool.push(user_id, load, last)
+                needed -= 1
+            # Users passed over this week keep their place for the next one.
+            for user_id in skipped:
+                pool.push(user_id, load, last)
+            if needed > 0:
+                unfilled.append({"week_start": week_start, "role": slot["role"], "missing": needed})
+
+    if not dry_run:
+        if rows:
+            db.execute(insert(models.RotaAssignment), rows)
+        mark_changed(db, models.RotaAssignment.__tablename__)
+        db.commit()
+
+    loads = [load[user_id] for user_id in eligible]
+    return {
+        "rota_id": rota.id,
+        "weeks": len(weeks),
+        "eligible_users": len(eligible),
+        "created": len(rows),
+        "min_per_user": min(loads) if loads else 0,
+        "max_per_user": max(loads) if loads else 0,
+        "dry_run": dry_run,
+        "unfilled": unfilled,
+        "assignments": [
+            {"user_id": row["user_id"], "role": row["role"], "week_start": row["week_start"]} for row in rows
+        ],
+    }
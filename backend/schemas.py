@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, ValidationInfo, field_validator
+from typing import Optional, List, Dict
+from datetime import datetime, timezone
+import json
 from backend.models import UserRole, FamilyStatus, OrderStatus, PackingStatus
 
 # User schemas
@@ -140,6 +141,25 @@ class InventoryItem(InventoryItemBase):
     class Config:
         from_attributes = True
 
+class ItemStockLevel(BaseModel):
+    item_id: int
+    total_quantity: float
+    min_quantity: float
+    max_quantity: Optional[float] = None
+    earliest_expiry: Optional[datetime] = None
+    batch_count: int
+    locations: Dict[str, float]
+    below_min: bool
+    updated_at: Optional[datetime] = None
+
+    @field_validator("locations", mode="before")
+    @classmethod
+    def parse_locations(cls, value):
+        return json.loads(value) if isinstance(value, str) else value or {}
+
+    class Config:
+        from_attributes = True
+
 # Weekly Requirement schemas
 class WeeklyRequirementBase(BaseModel):
     agency_id: int
@@ -210,6 +230,59 @@ class PackingListItem(PackingListItemBase):
     class Config:
         from_attributes = True
 
+# Packing list generation schemas
+class PackingListTemplateItem(BaseModel):
+    item_id: int
+    quantity_per_box: float
+
+class PackingListGenerate(BaseModel):
+    week_start: datetime
+    week_end: datetime
+    items: Optional[List[PackingListTemplateItem]] = None
+    dry_run: bool = False
+
+class GeneratedPackingListItem(BaseModel):
+    item_id: int
+    quantity_per_box: float
+    total_quantity_needed: float
+    available_quantity: float
+    shortfall: float
+
+class GeneratedPackingList(BaseModel):
+    packing_list_id: Optional[int] = None
+    week_start: datetime
+    week_end: datetime
+    total_boxes: int
+    agencies: int
+    items: List[GeneratedPackingListItem]
+    shortfall_items: int
+
+# Pick list schemas
+class PickListEntry(BaseModel):
+    item_id: int
+    item_name: str
+    inventory_item_id: int
+    quantity: float
+    expiry_date: Optional[datetime] = None
+
+class PickListLocation(BaseModel):
+    location: str
+    picks: List[PickListEntry]
+
+class PickListShortfall(BaseModel):
+    item_id: int
+    item_name: str
+    needed: float
+    available: float
+    shortfall: float
+
+class PickList(BaseModel):
+    packing_list_id: int
+    boxes: int
+    usable_on: datetime
+    locations: List[PickListLocation]
+    shortfalls: List[PickListShortfall]
+
 # Packing Session schemas
 class PackingSessionBase(BaseModel):
     packing_list_id: int
@@ -233,6 +306,24 @@ class PackingSession(PackingSessionBase):
     class Config:
         from_attributes = True
 
+# Volunteer Assignment schemas
+class VolunteerAssignmentBase(BaseModel):
+    packing_session_id: int
+    user_id: int
+    role: str
+    notes: Optional[str] = None
+
+class VolunteerAssignmentCreate(VolunteerAssignmentBase):
+    pass
+
+class VolunteerAssignment(VolunteerAssignmentBase):
+    id: int
+    confirmed: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Food Box schemas
 class FoodBoxBase(BaseModel):
     family_id: int
@@ -243,6 +334,10 @@ class FoodBoxBase(BaseModel):
 class FoodBoxCreate(FoodBoxBase):
     pass
 
+class SessionBoxesCreate(BaseModel):
+    # Defaults to the agencies with a confirmed requirement for the week.
+    agency_ids: Optional[List[int]] = None
+
 class FoodBoxUpdate(BaseModel):
     status: Optional[str] = None
     collected_at: Optional[datetime] = None
@@ -260,13 +355,58 @@ class FoodBox(FoodBoxBase):
     class Config:
         from_attributes = True
 
+class ExpiringBatch(BaseModel):
+    inventory_item_id: int
+    item_id: int
+    item_name: str
+    location: str
+    quantity: float
+    expiry_date: datetime
+    days_left: int
+    expired: bool
+
+class ItemForecast(BaseModel):
+    item_id: int
+    item_name: str
+    unit: str
+    weekly_average: float
+    weekly_trend: float
+    forecast: List[float]
+    projected_demand: float
+    in_stock: float
+    on_order: float
+    min_quantity: float
+    suggested_order: int
+
+class DemandForecast(BaseModel):
+    week_start: datetime
+    history_weeks: int
+    window_weeks: int
+    horizon_weeks: int
+    seasonal: bool
+    items: List[ItemForecast]
+
+class StockMovement(BaseModel):
+    id: int
+    item_id: int
+    inventory_item_id: Optional[int] = None
+    quantity_delta: float
+    balance_after: float
+    reason: str
+    order_id: Optional[int] = None
+    food_box_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Order schemas
 class OrderBase(BaseModel):
     order_type: str
     supplier: str
     order_date: datetime
     delivery_date: Optional[datetime] = None
-    total_cost: Optional[float] = None
+    total_cost: Optional[float] = None  # set by the server from the lines once the order has any; 0 after its last line is deleted
     notes: Optional[str] = None
 
 class OrderCreate(OrderBase):
@@ -291,12 +431,22 @@ class Order(OrderBase):
     class Config:
         from_attributes = True
 
+class OrderSpend(BaseModel):
+    supplier: str
+    order_type: str
+    month_start: datetime
+    order_count: int
+    total_cost: float
+
+    class Config:
+        from_attributes = True
+
 # Order Item schemas
 class OrderItemBase(BaseModel):
     item_id: int
     quantity: float
     unit_price: Optional[float] = None
-    total_price: Optional[float] = None
+    total_price: Optional[float] = None  # set by the server to quantity * unit_price when unit_price is given
     notes: Optional[str] = None
 
 class OrderItemCreate(OrderItemBase):
@@ -348,8 +498,15 @@ class RotaAssignmentBase(BaseModel):
     role: str
     notes: Optional[str] = None
 
+def _week_end_not_before_start(value, info: ValidationInfo):
+    # An inverted week overlaps nothing, so it would get past the conflict check.
+    week_start = info.data.get("week_start")
+    if value is not None and week_start is not None and value < week_start:
+        raise ValueError("week_end cannot be before week_start")
+    return value
+
 class RotaAssignmentCreate(RotaAssignmentBase):
-    pass
+    _week_order = field_validator("week_end")(_week_end_not_before_start)
 
 class RotaAssignmentUpdate(BaseModel):
     week_start: Optional[datetime] = None
@@ -358,6 +515,8 @@ class RotaAssignmentUpdate(BaseModel):
     confirmed: Optional[bool] = None
     notes: Optional[str] = None
 
+    _week_order = field_validator("week_end")(_week_end_not_before_start)
+
 class RotaAssignment(RotaAssignmentBase):
     id: int
     confirmed: bool
@@ -366,6 +525,62 @@ class RotaAssignment(RotaAssignmentBase):
     class Config:
         from_attributes = True
 
+class AssignmentConflict(BaseModel):
+    kind: str
+    assignment_id: int
+    conflicting_id: int
+    start: datetime
+    end: datetime
+
+# Rota scheduling schemas
+class RotaScheduleSlot(BaseModel):
+    role: str
+    per_week: int = 1
+    eligible_roles: List[UserRole]
+
+class RotaUnavailability(BaseModel):
+    user_id: int
+    start: datetime
+    end: datetime
+
+    @field_validator("start", "end")
+    @classmethod
+    def naive_utc(cls, value):
+        # Rota weeks are stored naive (UTC); "...Z" timestamps from browsers
+        # are converted so the two can be compared.
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class RotaScheduleRequest(BaseModel):
+    slots: List[RotaScheduleSlot]
+    unavailable: List[RotaUnavailability] = []
+    max_per_user: Optional[int] = None
+    min_gap_weeks: int = 1
+    replace: bool = False
+    dry_run: bool = False
+
+class RotaScheduleUnfilled(BaseModel):
+    week_start: datetime
+    role: str
+    missing: int
+
+class ScheduledAssignment(BaseModel):
+    user_id: int
+    role: str
+    week_start: datetime
+
+class RotaScheduleResult(BaseModel):
+    rota_id: int
+    weeks: int
+    eligible_users: int
+    created: int
+    min_per_user: int
+    max_per_user: int
+    dry_run: bool
+    unfilled: List[RotaScheduleUnfilled]
+    assignments: List[ScheduledAssignment]
+
 # Communication schemas
 class CommunicationBase(BaseModel):
     subject: str
@@ -385,6 +600,48 @@ class Communication(CommunicationBase):
     class Config:
         from_attributes = True
 
+# Bulk operation schemas
+class BulkRowResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    action: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[BulkRowResult]
+
+# Import schemas
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    dataset: str
+    rows: int
+    created: int
+    duplicates: int
+    failed: int
+    dry_run: bool
+    errors: List[ImportRowError]
+
+# Dashboard schemas
+class DashboardSummary(BaseModel):
+    total_agencies: int
+    active_agencies: int
+    families_by_status: Dict[str, int]
+    total_items: int
+    low_stock_items: int
+    packing_lists_by_status: Dict[str, int]
+    orders_by_status: Dict[str, int]
+    pending_orders: int
+    upcoming_sessions: int
+    boxes_packed_this_week: int
+    active_volunteers: int
+    generated_at: datetime
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
@@ -393,53 +650,20 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
 
-class UserLogin(BaseModel):
-    email: EmailStr
-    password: str
-
-# Additional schemas for new features
-class PackingSession(BaseModel):
-    id: int
-    packing_list_id: int
-    session_date: datetime
-    status: str
-    notes: Optional[str] = None
-    created_at: datetime
-    updated_at: Optional[datetime] = None
-
-    class Config:
-        from_attributes = True
-
-class PackingSessionCreate(BaseModel):
-    packing_list_id: int
-    session_date: datetime
-    status: str = "scheduled"
-    notes: Optional[str] = None
-
-class FoodBox(BaseModel):
+class Principal(BaseModel):
     id: int
-    family_id: int
-    packing_session_id: int
-    box_number: str
-    status: str
-    special_requirements: Optional[str] = None
-    created_at: datetime
-    updated_at: Optional[datetime] = None
+    email: str
+    role: UserRole
+    is_active: bool
 
     class Config:
         from_attributes = True
 
-class FoodBoxCreate(BaseModel):
-    family_id: int
-    packing_session_id: int
-    box_number: str
-    status: str = "packed"
-    special_requirements: Optional[str] = None
-
-class FoodBoxUpdate(BaseModel):
-    status: Optional[str] = None
-    special_requirements: Optional[str] = None
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
 
+# Additional schemas for new features
 class CommunicationTemplate(BaseModel):
     id: int
     name: str
@@ -0,0 +1,73 @@
+from datetime import date, datetime
+from functools import lru_cache
+from fastapi import HTTPException, Response
+from sqlalchemy import literal, select
+from backend.pagination import set_next_cursor
+import enum
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+def _default(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        # UTC as "Z", non-string keys allowed, matching Pydantic's JSON output.
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+@lru_cache(maxsize=None)
+def schema_columns(schema, model):
+    # Every response field must be a column of the model, or optional, in which
+    # case it is selected as its default just as Pydantic would fill it in. The
+    # fast path has no relationships or computed attributes to fall back on.
+    table = model.__table__
+    columns, missing = {}, []
+    for name, field in schema.model_fields.items():
+        if name in table.c:
+            columns[name] = table.c[name]
+        elif not field.is_required():
+            columns[name] = literal(field.get_default(call_default_factory=True)).label(name)
+        else:
+            missing.append(name)
+    if missing:
+        raise ValueError(f"{schema.__name__} fields are not columns of {table.name}: {', '.join(missing)}")
+    return columns
+
+def field_names(schema, fields: str = None):
+    # Parses a sparse fieldset (?fields=id,family_name) into schema field names,
+    # in schema order. The id is always included so cursors keep working.
+    names = tuple(schema.model_fields)
+    if not fields:
+        return names
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(names)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in names if name in requested)
+
+def select_for(schema, model, names=None):
+    # A Core select of just the columns to serialize (all of schema, or the
+    # sparse fieldset in names); the rows come back as tuples, so no ORM objects
+    # are built. Works with paginate().
+    columns = schema_columns(schema, model)
+    return select(*(columns[name] for name in names or schema.model_fields))
+
+def rows_response(rows, schema, limit: int = None, names=None):
+    # Serializes column tuples straight to JSON bytes, skipping Pydantic
+    # validation. Only for rows read from the database, which already satisfy
+    # the schema; the route keeps response_model for the OpenAPI docs.
+    names = names or tuple(schema.model_fields)
+    response = Response(content=dumps([dict(zip(names, row)) for row in rows]), media_type="application/json")
+    if limit is not None:
+        set_next_cursor(response, rows, limit)
+    return response
@@ -0,0 +1,154 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from backend import models
+from backend.changes import mark_changed
+
+CHUNK_SIZE = 1000
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = sorted(set(values))
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def line_total(quantity, unit_price, total_price=None):
+    # A line with a unit price is always quantity * unit_price; without one,
+    # the entered total_price (a lump sum) is kept.
+    if unit_price is None or quantity is None:
+        return total_price
+    return round(quantity * unit_price, 2)
+
+def month_start(value: datetime):
+    return datetime(value.year, value.month, 1)
+
+def _next_month(value: datetime):
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+def spend_key(order):
+    # The summary row an order counts towards, from an Order or a
+    # (supplier, order_type, order_date) row.
+    supplier, order_type, order_date = (
+        (order.supplier, order.order_type, order.order_date) if isinstance(order, models.Order) else order
+    )
+    return (supplier, order_type, month_start(order_date))
+
+def order_keys(db: Session, order_ids):
+    keys = set()
+    for ids in _chunks(order_ids):
+        rows = db.execute(
+            select(models.Order.supplier, models.Order.order_type, models.Order.order_date)
+            .where(models.Order.id.in_(ids))
+        )
+        keys.update(spend_key(row) for row in rows)
+    return keys
+
+def refresh_spend(db: Session, keys=None):
+    # Recompute the order_spend_summary rows for the given (supplier,
+    # order_type, month_start) keys (all of them when None) inside the
+    # caller's transaction. Each key is one range read of the orders
+    # (supplier, order_type, order_date) index; order_items are not read.
+    order = models.Order
+    summary = models.OrderSpendSummary
+    counted = order.status != models.OrderStatus.CANCELLED
+    rows = []
+    if keys is None:
+        totals = defaultdict(lambda: [0, 0.0])
+        for supplier, order_type, order_date, total_cost in db.execute(
+            select(order.supplier, order.order_type, order.order_date, order.total_cost).where(counted)
+        ):
+            entry = totals[spend_key((supplier, order_type, order_date))]
+            entry[0] += 1
+            entry[1] += total_cost or 0.0
+        db.execute(delete(summary))
+        rows = [
+            {"supplier": key[0], "order_type": key[1], "month_start": key[2], "order_count": count, "total_cost": round(total, 2)}
+            for key, (count, total) in totals.items()
+        ]
+    else:
+        keys = set(keys)
+        if not keys:
+            return
+        for supplier, order_type, month in keys:
+            count, total = db.execute(
+                select(func.count(), func.coalesce(func.sum(order.total_cost), 0.0)).where(
+                    order.supplier == supplier,
+                    order.order_type == order_type,
+                    order.order_date >= month,
+                    order.order_date < _next_month(month),
+                    counted,
+                )
+            ).one()
+            db.execute(delete(summary).where(
+                summary.supplier == supplier, summary.order_type == order_type, summary.month_start == month,
+            ))
+            if count:
+                rows.append({"supplier": supplier, "order_type": order_type, "month_start": month,
+                             "order_count": count, "total_cost": round(total, 2)})
+    if rows:
+        db.execute(insert(summary), rows)
+    mark_changed(db, summary.__tablename__)
+
+def refresh_order_totals(db: Session, order_ids):
+    # Sets total_cost of each order to the sum of its lines (one grouped read
+    # of the order_id index per chunk) and refreshes the spend rows they
+    # count towards. An order passed in after losing its last line gets 0:
+    # its total followed the lines that are gone.
+    order_ids = set(order_ids)
+    if not order_ids:
+        return
+    values = []
+    for ids in _chunks(order_ids):
+        sums = dict(db.execute(
+            select(models.OrderItem.order_id, func.coalesce(func.sum(models.OrderItem.total_price), 0.0))
+            .where(models.OrderItem.order_id.in_(ids))
+            .group_by(models.OrderItem.order_id)
+        ).all())
+        values.extend({"order_id": order_id, "total": round(sums.get(order_id, 0.0), 2)} for order_id in ids)
+    db.connection().execute(
+        update(models.Order.__table__)
+        .where(models.Order.__table__.c.id == bindparam("order_id"))
+        .values(total_cost=bindparam("total")),
+        values,
+    )
+    mark_changed(db, models.Order.__tablename__)
+    refresh_spend(db, order_keys(db, order_ids))
+
+def order_written(db: Session, order: models.Order, previous_key=None):
+    # Call after an order is written (flushed), before commit, with the spend
+    # key it had before the change. An order with lines takes its total from
+    # them; one without keeps the total that was entered, until lines are
+    # added (deleting the last one sets it to 0).
+    has_lines = db.execute(
+        select(models.OrderItem.id).where(models.OrderItem.order_id == order.id).limit(1)
+    ).first() is not None
+    if has_lines:
+        refresh_order_totals(db, [order.id])
+    refresh_spend(db, {key for key in (previous_key, spend_key(order)) if key is not None})
+
+def order_items_changed(db: Session, item_ids=(), order_ids=()):
+    # Call after order items are written (flushed), before commit: recomputes
+    # the lines' total_price, then the totals of their orders plus order_ids
+    # (orders that lost lines), then the affected spend rows.
+    order_ids = set(order_ids)
+    values = []
+    for ids in _chunks([item_id for item_id in item_ids if item_id is not None]):
+        for item_id, order_id, quantity, unit_price, total_price in db.execute(
+            select(
+                models.OrderItem.id, models.OrderItem.order_id, models.OrderItem.quantity,
+                models.OrderItem.unit_price, models.OrderItem.total_price,
+            ).where(models.OrderItem.id.in_(ids))
+        ):
+            order_ids.add(order_id)
+            total = line_total(quantity, unit_price, total_price)
+            if total != total_price:
+                values.append({"line_id": item_id, "total": total})
+    if values:
+        db.connection().execute(
+            update(models.OrderItem.__table__)
+            .where(models.OrderItem.__table__.c.id == bindparam("line_id"))
+            .values(total_price=bindparam("total")),
+            values,
+        )
+        mark_changed(db, models.OrderItem.__tablename__)
+    refresh_order_totals(db, order_ids)
@@ -0,0 +1,61 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session, configure_mappers
+from backend import dashboard, migrations, models
+from backend.database import DB_POOL_SIZE, engine as default_engine, pool_capacity
+from backend.pagination import paginate
+import os
+import time
+
+# Schema changes run from the lifespan hook only when AUTO_MIGRATE is on. With
+# several workers, run `python -m backend.migrations upgrade` once instead
+# (run_backend.py --prod does this before starting them).
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+WARM_UP = os.getenv("WARM_UP", "true").lower() == "true"
+WARM_POOL_CONNECTIONS = int(os.getenv("WARM_POOL_CONNECTIONS", str(DB_POOL_SIZE)))
+
+# Queries every early request runs, with the same shapes the endpoints build, so
+# SQLAlchemy's compiled cache already holds them when traffic arrives.
+def _hot_queries(db: Session):
+    yield db.query(models.User).filter(models.User.email == "")
+    yield db.query(models.User).filter(models.User.id == 0)
+    for model in (models.Item, models.Agency, models.Family, models.InventoryItem, models.Order, models.Rota):
+        yield paginate(db.query(model), model.id, 0, 1)
+    yield paginate(db.query(models.ItemStockLevel), models.ItemStockLevel.item_id, 0, 1)
+
+def warm_pool(db_engine, size: int):
+    # Check out connections side by side so the pool really opens that many
+    # (and runs the connect-time pragmas) before the first request.
+    connections = []
+    try:
+        for _ in range(min(size, pool_capacity(db_engine))):
+            connections.append(db_engine.connect())
+            connections[-1].execute(select(1))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+def warm_up(db_engine=default_engine):
+    started = time.perf_counter()
+    configure_mappers()
+    connections = warm_pool(db_engine, WARM_POOL_CONNECTIONS)
+    queries = 0
+    with Session(bind=db_engine) as db:
+        for query in _hot_queries(db):
+            query.all()
+            queries += 1
+        dashboard.get_summary(db)
+    return {
+        "connections": connections,
+        "queries": queries,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+def run(db_engine=default_engine):
+    # Blocking startup work, called from the lifespan hook in a worker thread.
+    result = {"migrations": []}
+    if AUTO_MIGRATE:
+        result["migrations"] = migrations.upgrade(db_engine)
+    if WARM_UP:
+        result["warm_up"] = warm_up(db_engine)
+    return result
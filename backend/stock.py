@@ -0,0 +1,170 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from backend import models
+from backend.changes import mark_changed
+import json
+
+UNASSIGNED_LOCATION = "unassigned"
+
+def _aggregate(db: Session, item_ids=None):
+    # One grouped pass over inventory_items (via the item_id index) per call.
+    inventory = models.InventoryItem
+    query = select(
+        inventory.item_id,
+        inventory.location,
+        func.sum(inventory.quantity),
+        func.max(inventory.min_quantity),
+        func.max(inventory.max_quantity),
+        func.min(inventory.expiry_date),
+        func.count(),
+    ).group_by(inventory.item_id, inventory.location)
+    if item_ids is not None:
+        query = query.where(inventory.item_id.in_(item_ids))
+
+    levels = {}
+    for item_id, location, quantity, min_quantity, max_quantity, expiry, batches in db.execute(query):
+        level = levels.setdefault(item_id, {
+            "item_id": item_id,
+            "total_quantity": 0.0,
+            "min_quantity": 0.0,
+            "max_quantity": None,
+            "earliest_expiry": None,
+            "batch_count": 0,
+            "locations": {},
+        })
+        quantity = quantity or 0.0
+        level["total_quantity"] += quantity
+        level["min_quantity"] = max(level["min_quantity"], min_quantity or 0.0)
+        if max_quantity is not None:
+            level["max_quantity"] = max(level["max_quantity"] or 0.0, max_quantity)
+        if expiry is not None and (level["earliest_expiry"] is None or expiry < level["earliest_expiry"]):
+            level["earliest_expiry"] = expiry
+        level["batch_count"] += batches
+        key = location or UNASSIGNED_LOCATION
+        level["locations"][key] = level["locations"].get(key, 0.0) + quantity
+
+    for level in levels.values():
+        level["below_min"] = level["total_quantity"] < level["min_quantity"]
+        level["locations"] = json.dumps(level["locations"], sort_keys=True)
+    return list(levels.values())
+
+def refresh_levels(db: Session, item_ids=None):
+    # Recompute the stock level rows for the given items (all items when None)
+    # inside the caller's transaction.
+    if item_ids is not None:
+        item_ids = sorted(set(item_ids))
+        if not item_ids:
+            return
+    levels = _aggregate(db, item_ids)
+    statement = delete(models.ItemStockLevel)
+    if item_ids is not None:
+        statement = statement.where(models.ItemStockLevel.item_id.in_(item_ids))
+    db.execute(statement)
+    if levels:
+        db.execute(insert(models.ItemStockLevel), levels)
+    mark_changed(db, models.ItemStockLevel.__tablename__)
+
+def stock_totals(db: Session, item_ids):
+    if not item_ids:
+        return {}
+    rows = db.execute(
+        select(models.ItemStockLevel.item_id, models.ItemStockLevel.total_quantity)
+        .where(models.ItemStockLevel.item_id.in_(item_ids))
+    )
+    return dict(rows.all())
+
+def today():
+    return datetime.combine(datetime.utcnow().date(), time.min)
+
+def usable_totals(db: Session, item_ids, usable_on: datetime):
+    # In-stock quantity of each item that has not expired before usable_on:
+    # what the FEFO pick list can actually take. One aggregate over the
+    # (item_id, expiry_date) index.
+    if not item_ids:
+        return {}
+    inventory = models.InventoryItem
+    rows = db.execute(
+        select(inventory.item_id, func.sum(inventory.quantity))
+        .where(
+            inventory.item_id.in_(sorted(set(item_ids))),
+            inventory.quantity > 0,
+            or_(inventory.expiry_date.is_(None), inventory.expiry_date >= usable_on),
+        )
+        .group_by(inventory.item_id)
+    )
+    return dict(rows.all())
+
+def fefo_batches(db: Session, item_ids, in_stock_only: bool = True, lock: bool = False, usable_on: datetime = None):
+    # Batches of each item in first-expiry-first-out order (undated last, then
+    # oldest first): one query over the (item_id, expiry_date) index for all
+    # items, grouped in a single pass. usable_on leaves out batches that
+    # expired before that day. With lock, the rows are locked until commit on
+    # databases that support it.
+    inventory = models.InventoryItem
+    query = (
+        select(inventory.id, inventory.item_id, inventory.quantity, inventory.expiry_date, inventory.location)
+        .where(inventory.item_id.in_(sorted(set(item_ids))))
+        .order_by(inventory.item_id, inventory.expiry_date.is_(None), inventory.expiry_date, inventory.id)
+    )
+    if in_stock_only:
+        query = query.where(inventory.quantity > 0)
+    if usable_on is not None:
+        query = query.where(or_(inventory.expiry_date.is_(None), inventory.expiry_date >= usable_on))
+    if lock:
+        query = query.with_for_update()
+    batches = {}
+    for row in db.execute(query):
+        batches.setdefault(row.item_id, []).append(row)
+    return batches
+
+def allocate(batches, quantity: float):
+    # Takes quantity from batches in the order given. Returns the
+    # (batch, amount) picks and whatever could not be covered.
+    picks = []
+    for batch in batches:
+        if quantity <= 0:
+            break
+        amount = min(max(batch.quantity, 0.0), quantity)
+        if amount > 0:
+            picks.append((batch, amount))
+            quantity -= amount
+    return picks, max(quantity, 0.0)
+
+def expiring_soon(db: Session, days: int, location: str = None, include_expired: bool = True, limit: int = 500):
+    # In-stock batches whose expiry date falls within the next days days, soonest
+    # first, from one range read of the expiry_date index.
+    inventory = models.InventoryItem
+    start = today()
+    query = (
+        select(
+            inventory.id, inventory.item_id, models.Item.name, inventory.location,
+            inventory.quantity, inventory.expiry_date,
+        )
+        .join(models.Item, models.Item.id == inventory.item_id)
+        .where(
+            inventory.expiry_date.is_not(None),
+            inventory.expiry_date < start + timedelta(days=days + 1),
+            inventory.quantity > 0,
+        )
+        .order_by(inventory.expiry_date, inventory.id)
+        .limit(limit)
+    )
+    if not include_expired:
+        query = query.where(inventory.expiry_date >= start)
+    if location:
+        query = query.where(inventory.location == location)
+    batches = []
+    for batch_id, item_id, name, batch_location, quantity, expiry_date in db.execute(query):
+        days_left = (expiry_date.date() - start.date()).days
+        batches.append({
+            "inventory_item_id": batch_id,
+            "item_id": item_id,
+            "item_name": name,
+            "location": batch_location or UNASSIGNED_LOCATION,
+            "quantity": quantity,
+            "expiry_date": expiry_date,
+            "days_left": days_left,
+            "expired": days_left < 0,
+        })
+    return batches
@@ -1,19 +1,91 @@
 #!/usr/bin/env python3
 """
 Script to run the FastAPI backend server
+
+Development (default): single process with auto-reload.
+    python run_backend.py
+
+Production: multiple workers, no reload, uvloop/httptools when installed.
+Migrations run once here before the workers start, not in each worker.
+    python run_backend.py --prod --workers 4
+    APP_ENV=production python run_backend.py
 """
-import uvicorn
+import argparse
+import importlib.util
 import os
 import sys
 
+import uvicorn
+
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def default_workers():
+    # The app is async with a per-worker threadpool, so one process per core
+    # keeps every core busy without oversubscribing.
+    return os.cpu_count() or 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Storehouse Manager API")
+    parser.add_argument("--prod", action="store_true", default=os.getenv("APP_ENV") == "production",
+                        help="production profile (also enabled by APP_ENV=production)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=env_int("PORT", 8001))
+    parser.add_argument("--workers", type=int, default=env_int("WEB_CONCURRENCY", default_workers()))
+    parser.add_argument("--keep-alive", type=int, default=env_int("KEEP_ALIVE_TIMEOUT", 5),
+                        help="seconds to hold idle keep-alive connections open")
+    parser.add_argument("--backlog", type=int, default=env_int("BACKLOG", 2048))
+    parser.add_argument("--graceful-timeout", type=int, default=env_int("GRACEFUL_TIMEOUT", 30),
+                        help="seconds to drain in-flight requests on shutdown")
+    parser.add_argument("--limit-concurrency", type=int, default=os.getenv("LIMIT_CONCURRENCY"),
+                        help="per-worker connection limit before answering 503")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    return parser.parse_args(argv)
+
+
+def server_options(args):
+    if not args.prod:
+        return {
+            "host": args.host,
+            "port": args.port,
+            "reload": True,
+            "log_level": args.log_level,
+        }
+    return {
+        "host": args.host,
+        "port": args.port,
+        "reload": False,
+        "workers": args.workers,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "timeout_keep_alive": args.keep_alive,
+        "backlog": args.backlog,
+        # On SIGTERM uvicorn stops accepting connections and waits up to this
+        # long for in-flight requests before running the shutdown hooks.
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "limit_concurrency": int(args.limit_concurrency) if args.limit_concurrency else None,
+        "proxy_headers": True,
+        "access_log": False,
+        "log_level": args.log_level,
+    }
+
+
+def migrate_once():
+    from backend.migrations import upgrade
+
+    for version, name in upgrade():
+        print(f"Applied {version:04d} {name}")
+    os.environ["AUTO_MIGRATE"] = "false"
+
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "backend.main:app",
-        host="0.0.0.0",
-        port=8001,
-        reload=True,
-        log_level="info"
-    )
+    args = parse_args()
+    if args.prod:
+        migrate_once()
+    uvicorn.run("backend.main:app", **server_options(args))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bulk write path against one-row-per-request writes.
+
+For each size in --sizes, inserts that many food boxes into a throwaway SQLite
+database twice: once the way POST /food-boxes/ does it (add, commit, refresh
+per row) and once through backend.bulk.apply (chunked executemany inside one
+transaction).
+
+Usage:
+    python scripts/bench_bulk.py --sizes 1000 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(args):
+    from backend.database import SessionLocal
+    from backend.migrations import upgrade
+    from backend import bulk, models, schemas
+
+    upgrade()
+    print(f"{'rows':>8} {'per-row s':>10} {'bulk s':>10} {'speedup':>8}")
+    for size in args.sizes:
+        rows = [{"family_id": 1, "packing_session_id": 1, "box_number": f"B{i}"} for i in range(size)]
+
+        db = SessionLocal()
+        start = time.perf_counter()
+        for row in rows:
+            db_food_box = models.FoodBox(**row)
+            db.add(db_food_box)
+            db.commit()
+            db.refresh(db_food_box)
+        per_row = time.perf_counter() - start
+        db.close()
+
+        db = SessionLocal()
+        start = time.perf_counter()
+        result = bulk.apply(db, models.FoodBox, schemas.FoodBoxCreate, schemas.FoodBoxUpdate, rows)
+        bulk_time = time.perf_counter() - start
+        db.close()
+        assert result["created"] == size
+
+        print(f"{size:>8} {per_row:>10.3f} {bulk_time:>10.3f} {per_row / bulk_time:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Check that streaming exports keep memory flat as the table grows.
+
+For each size in --sizes, seeds that many food boxes into a throwaway SQLite
+database and consumes the CSV and NDJSON export streams, reporting time and
+peak traced memory. For comparison it also loads the same rows the way the
+list endpoint does (ORM objects validated into Pydantic models, all at once).
+Times include tracemalloc overhead, so compare them only with each other.
+
+Usage:
+    python scripts/bench_export.py --sizes 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, size
+
+
+def run(args):
+    from sqlalchemy import delete, insert, select
+    from backend import exports, models, schemas
+    from backend.database import SessionLocal, engine
+    from backend.migrations import upgrade
+
+    upgrade(engine)
+    table = models.FoodBox.__table__
+
+    def consume(chunks):
+        statement = select(table).order_by(table.c.id)
+        return lambda: sum(len(chunk) for chunk in chunks(statement, exports.EXPORT_BATCH_SIZE))
+
+    def load_all():
+        db = SessionLocal()
+        try:
+            rows = [schemas.FoodBox.model_validate(box) for box in db.query(models.FoodBox).all()]
+            return sum(len(row.model_dump_json()) for row in rows)
+        finally:
+            db.close()
+
+    print(f"{'rows':>8} {'method':<10} {'seconds':>8} {'peak MB':>8} {'bytes':>12}")
+    for size in args.sizes:
+        with engine.begin() as conn:
+            conn.execute(delete(table))
+            conn.execute(insert(table), [
+                {"family_id": n % 500 + 1, "packing_session_id": 1, "box_number": f"B{n}",
+                 "status": "packed", "notes": "export benchmark row"}
+                for n in range(size)
+            ])
+        for name, func in (
+            ("csv", consume(exports._csv_chunks)),
+            ("ndjson", consume(exports._ndjson_chunks)),
+            ("orm-list", load_all),
+        ):
+            elapsed, peak, produced = measure(func)
+            print(f"{size:>8} {name:<10} {elapsed:>8.2f} {peak:>8.1f} {produced:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/export.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
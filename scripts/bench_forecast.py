@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Time the demand forecast behind GET /inventory/forecast: a cold build, a
+cached call, and a call after one new weekly requirement. After a new
+requirement, only the box counts are re-read. For comparison, the same
+moving average and trend are also computed one item at a time in plain
+Python.
+
+Seeds --weeks weeks of packing lists with --items items each and
+requirements from --agencies agencies into a throwaway SQLite database.
+
+Usage:
+    python scripts/bench_forecast.py --weeks 156 --items 300 --agencies 40
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(engine, args, monday):
+    from sqlalchemy import insert
+    from backend import models
+
+    rng = random.Random(11)
+    weeks = [monday - timedelta(weeks=args.weeks - 1 - k) for k in range(args.weeks)]
+    with engine.begin() as conn:
+        conn.execute(insert(models.Item), [{"name": f"Item {n}", "category": "food", "unit": "kg"} for n in range(args.items)])
+        conn.execute(insert(models.Agency), [
+            {"name": f"Agency {n}", "contact_person": "c", "email": f"agency{n}@storehouse.com"} for n in range(args.agencies)
+        ])
+        conn.execute(insert(models.WeeklyRequirement), [
+            {"agency_id": agency + 1, "week_start": week, "week_end": week + timedelta(days=6),
+             "total_families": boxes, "total_boxes": boxes, "status": "collected"}
+            for week in weeks for agency in range(args.agencies) for boxes in [rng.randrange(5, 30)]
+        ])
+        conn.execute(insert(models.PackingList), [
+            {"week_start": week, "week_end": week + timedelta(days=6), "total_boxes": 15 * args.agencies}
+            for week in weeks
+        ])
+        per_box = [rng.uniform(0.5, 3) for _ in range(args.items)]
+        conn.execute(insert(models.PackingListItem), [
+            {"packing_list_id": list_id + 1, "item_id": item + 1, "quantity_per_box": per_box[item],
+             "total_quantity_needed": per_box[item] * 15 * args.agencies * rng.uniform(0.8, 1.2)}
+            for list_id in range(args.weeks) for item in range(args.items)
+        ])
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(timings)
+
+
+def per_item(demand, window):
+    # The same average and trend, item by item in plain Python.
+    results = []
+    for row in demand.tolist():
+        recent = row[-window:]
+        span = len(recent)
+        average = sum(recent) / span
+        offsets = [t - (span - 1) / 2 for t in range(span)]
+        trend = sum(y * t for y, t in zip(recent, offsets)) / sum(t * t for t in offsets)
+        results.append([max(0.0, average + trend * ((span - 1) / 2 + step)) for step in range(1, 5)])
+    return results
+
+
+def run(args):
+    from backend import forecast, models
+    from backend.database import SessionLocal, engine
+    from backend.migrations import upgrade
+
+    upgrade(engine)
+    now = datetime.utcnow()
+    monday = forecast.week_of(now)
+    seed(engine, args, monday)
+    db = SessionLocal()
+
+    def cold():
+        forecast.forecast_cache.clear()
+        forecast._lists_cache.clear()
+        forecast._boxes_cache.clear()
+        return forecast.suggest_orders(db, now=now)
+
+    result, cold_ms = timed(cold, args.repeat)
+    _, cached_ms = timed(lambda: forecast.suggest_orders(db, now=now), args.repeat)
+
+    def after_requirement():
+        db.add(models.WeeklyRequirement(
+            agency_id=1, week_start=monday, week_end=monday + timedelta(days=6), total_families=1, total_boxes=1,
+        ))
+        db.commit()
+        return forecast.suggest_orders(db, now=now)
+
+    _, incremental_ms = timed(after_requirement, args.repeat)
+    item_ids, demand, weeks = forecast.demand_history(db, monday)
+    _, numpy_ms = timed(lambda: forecast.project(demand, forecast.np.array([forecast._phase(w) for w in weeks]), forecast.np.zeros(4, dtype=int), 8), args.repeat)
+    _, python_ms = timed(lambda: per_item(demand, 8), args.repeat)
+    print(f"{len(result['items'])} items, {result['history_weeks']} weeks of history, seasonal={result['seasonal']}")
+    print(f"cold forecast:                  {cold_ms:8.1f} ms")
+    print(f"cached forecast:                {cached_ms:8.1f} ms")
+    print(f"after a new weekly requirement: {incremental_ms:8.1f} ms")
+    print(f"projection, vectorised:         {numpy_ms:8.1f} ms (includes seasonal index)")
+    print(f"average and trend, per item:    {python_ms:8.1f} ms (no seasonal index)")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=156)
+    parser.add_argument("--items", type=int, default=300)
+    parser.add_argument("--agencies", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/forecast.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Time stock reconciliation when boxes are packed in bulk.
+
+Seeds a packing list of --items items (three dated batches each) and a
+packing session into a throwaway SQLite database, then creates --boxes food
+boxes in one bulk request, with and without the stock ledger hook. The
+ledger run writes one movement per box and item, each consumed in
+first-expiry-first-out order.
+
+Usage:
+    python scripts/bench_ledger.py --boxes 500 --items 15
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(engine, args):
+    from sqlalchemy import insert
+    from backend import models
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Agency), [{"name": "Agency", "contact_person": "Contact", "email": "agency@storehouse.com"}])
+        conn.execute(insert(models.Family), [
+            {"agency_id": 1, "family_name": f"Family {n}", "contact_person": "Contact", "family_size": 3}
+            for n in range(args.boxes)
+        ])
+        conn.execute(insert(models.Item), [{"name": f"Item {n}", "category": "food", "unit": "each"} for n in range(args.items)])
+        conn.execute(insert(models.InventoryItem), [
+            {"item_id": item_id, "quantity": args.boxes, "location": "A",
+             "expiry_date": datetime(2027, 1, 1) + timedelta(days=30 * batch)}
+            for item_id in range(1, args.items + 1) for batch in range(3)
+        ])
+        conn.execute(insert(models.PackingList), [{
+            "week_start": datetime(2026, 1, 5), "week_end": datetime(2026, 1, 11), "total_boxes": args.boxes,
+        }])
+        conn.execute(insert(models.PackingListItem), [
+            {"packing_list_id": 1, "item_id": item_id, "quantity_per_box": 2, "total_quantity_needed": 2 * args.boxes}
+            for item_id in range(1, args.items + 1)
+        ])
+        conn.execute(insert(models.PackingSession), [
+            {"packing_list_id": 1, "scheduled_date": datetime(2026, 1, 6)},
+            {"packing_list_id": 1, "scheduled_date": datetime(2026, 1, 7)},
+        ])
+
+
+def run(args):
+    from sqlalchemy import func, select
+    from backend import bulk, ledger, models, schemas, stock
+    from backend.database import SessionLocal, engine
+    from backend.migrations import upgrade
+
+    upgrade(engine)
+    seed(engine, args)
+    db = SessionLocal()
+    stock.refresh_levels(db)
+    db.commit()
+
+    for session_id, hook in ((1, None), (2, lambda session, created, updated: ledger.boxes_packed(session, created))):
+        rows = [
+            {"family_id": n + 1, "packing_session_id": session_id, "box_number": f"S{session_id}-{n:05d}"}
+            for n in range(args.boxes)
+        ]
+        started = time.perf_counter()
+        bulk.apply(db, models.FoodBox, schemas.FoodBoxCreate, schemas.FoodBoxUpdate, rows, after_write=hook)
+        elapsed = (time.perf_counter() - started) * 1000
+        label = "with ledger" if hook else "without ledger"
+        print(f"{args.boxes} boxes {label}: {elapsed:.1f} ms")
+
+    movements = db.execute(select(func.count()).select_from(models.StockMovement)).scalar()
+    print(f"{movements} movements written, {args.boxes * args.items} expected")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", type=int, default=500)
+    parser.add_argument("--items", type=int, default=15)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/ledger.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark offset pagination against keyset (cursor) pagination on food_boxes.
+
+Fills a throwaway SQLite database with --rows food boxes, then times fetching
+a page of --limit rows at increasing depths with skip/limit and with a cursor.
+Offset pages get slower the deeper they go; cursor pages stay constant.
+
+Usage:
+    python scripts/bench_pagination.py --rows 500000 --limit 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def time_page(fetch, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fetch()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(args):
+    from sqlalchemy import insert
+    from backend.database import SessionLocal, engine
+    from backend.models import Base, FoodBox
+    from backend.pagination import encode_cursor, paginate
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    chunk = 10000
+    for start in range(0, args.rows, chunk):
+        db.execute(insert(FoodBox), [
+            {"family_id": 1, "packing_session_id": 1, "box_number": f"B{i}", "status": "packed"}
+            for i in range(start, min(args.rows, start + chunk))
+        ])
+    db.commit()
+
+    print(f"{'depth':>10} {'offset ms':>10} {'cursor ms':>10}")
+    depth = args.limit
+    while depth < args.rows:
+        last_id = db.query(FoodBox.id).order_by(FoodBox.id).offset(depth - 1).limit(1).scalar()
+        cursor = encode_cursor(last_id)
+        offset_ms = time_page(lambda: paginate(db.query(FoodBox), FoodBox.id, depth, args.limit).all())
+        cursor_ms = time_page(lambda: paginate(db.query(FoodBox), FoodBox.id, 0, args.limit, cursor).all())
+        print(f"{depth:>10} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+        depth *= 10
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
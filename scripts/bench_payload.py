@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Measure payload size and latency of the largest list endpoints with sparse
+fieldsets and response compression.
+
+Seeds --families families (and one food box each) into a throwaway SQLite
+database, then requests /families/ and /food-boxes/ with --limit rows, with
+and without a fields= projection, under each Accept-Encoding. Prints the bytes
+sent on the wire and the median in-process latency (which includes the
+compression CPU time).
+
+br is only offered by the server when brotli-asgi is installed.
+
+Usage:
+    python scripts/bench_payload.py --families 5000 --limit 1000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CASES = (
+    ("/families/", None),
+    ("/families/", "id,family_name,contact_person,family_size,status"),
+    ("/food-boxes/", None),
+    ("/food-boxes/", "id,family_id,box_number,status"),
+)
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def seed(engine, families):
+    from sqlalchemy import insert
+    from backend import models
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Agency), [{"name": "Agency", "contact_person": "Contact", "email": "agency@storehouse.com"}])
+        conn.execute(insert(models.Family), [
+            {
+                "agency_id": 1, "family_name": f"Family {n}", "contact_person": f"Contact Person {n % 997}",
+                "phone": f"07700 {n:06d}", "address": f"{n % 300} High Street, Flat {n % 40}, Townsville, TS{n % 9} 4AB",
+                "family_size": n % 7 + 1,
+                "special_requirements": "Vegetarian; no nuts" if n % 3 == 0 else "Halal, gluten free, baby food for one infant",
+            }
+            for n in range(families)
+        ])
+        conn.execute(insert(models.FoodBox), [
+            {"family_id": n + 1, "packing_session_id": n % 20 + 1, "box_number": f"WK42-{n:05d}", "status": "packed",
+             "notes": "Left with neighbour at number 12" if n % 5 == 0 else None}
+            for n in range(families)
+        ])
+
+
+def run(args):
+    from fastapi.testclient import TestClient
+    from backend.auth import create_access_token
+    from backend.database import SessionLocal, engine
+    from backend.main import app
+    from backend.migrations import upgrade
+    from backend.models import User, UserRole
+
+    upgrade(engine)
+    seed(engine, args.families)
+    db = SessionLocal()
+    db.add(User(email="payload@storehouse.com", hashed_password="x", full_name="Payload", role=UserRole.COORDINATOR))
+    db.commit()
+    db.close()
+
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {create_access_token({'sub': 'payload@storehouse.com'})}"
+        print(f"{'endpoint':<14} {'fields':<8} {'encoding':<9} {'bytes':>9} {'vs full':>8} {'median ms':>10}")
+        for path, fields in CASES:
+            params = {"limit": args.limit}
+            if fields:
+                params["fields"] = fields
+            for encoding in ENCODINGS:
+                sizes, latencies = [], []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    with client.stream("GET", path, params=params, headers={"Accept-Encoding": encoding}) as response:
+                        body = b"".join(response.iter_raw())
+                        used = response.headers.get("content-encoding", "identity")
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    sizes.append(len(body))
+                if used != encoding:
+                    print(f"{path:<14} {'sparse' if fields else 'full':<8} {encoding:<9} not offered by the server")
+                    continue
+                if encoding == "identity" and fields is None:
+                    args.full_sizes[path] = sizes[0]
+                print(f"{path:<14} {'sparse' if fields else 'full':<8} {encoding:<9} {sizes[0]:>9} "
+                      f"{sizes[0] / args.full_sizes[path]:>7.1%} {statistics.median(latencies):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--families", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    args.full_sizes = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/payload.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Time the rota auto-scheduler on a full quarter.
+
+Seeds --volunteers packing volunteers and --drivers drivers into a throwaway
+SQLite database, plus a 13-week rota and some unavailability, then runs
+scheduler.schedule() as a dry run --repeat times and once for real (the bulk
+insert included). Prints the timings and how evenly the assignments were
+spread.
+
+Usage:
+    python scripts/bench_scheduler.py --volunteers 500 --drivers 100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(engine, args):
+    from sqlalchemy import insert
+    from backend import models
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"email": f"volunteer{n}@storehouse.com", "hashed_password": "x", "full_name": f"Volunteer {n}",
+             "role": models.UserRole.PACKING_VOLUNTEER if n < args.volunteers else models.UserRole.DRIVER}
+            for n in range(args.volunteers + args.drivers)
+        ])
+        conn.execute(insert(models.Rota), [{
+            "name": "Quarter", "rota_type": "packing",
+            "quarter_start": datetime(2026, 1, 5), "quarter_end": datetime(2026, 1, 5) + timedelta(weeks=13, days=-1),
+        }])
+
+
+def unavailability(args):
+    # A tenth of everyone away for a random fortnight.
+    rng = random.Random(42)
+    users = rng.sample(range(1, args.volunteers + args.drivers + 1), (args.volunteers + args.drivers) // 10)
+    entries = []
+    for user_id in users:
+        start = datetime(2026, 1, 5) + timedelta(weeks=rng.randrange(12))
+        entries.append({"user_id": user_id, "start": start, "end": start + timedelta(days=13)})
+    return entries
+
+
+def run(args):
+    from backend import models, scheduler
+    from backend.database import SessionLocal, engine
+    from backend.migrations import upgrade
+
+    upgrade(engine)
+    seed(engine, args)
+    slots = [
+        {"role": "packer", "per_week": args.packers, "eligible_roles": [models.UserRole.PACKING_VOLUNTEER]},
+        {"role": "driver", "per_week": args.per_week_drivers, "eligible_roles": [models.UserRole.DRIVER]},
+    ]
+    unavailable = unavailability(args)
+
+    db = SessionLocal()
+    rota = db.get(models.Rota, 1)
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        scheduler.schedule(db, rota, slots, unavailable, dry_run=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    started = time.perf_counter()
+    result = scheduler.schedule(db, rota, slots, unavailable)
+    committed = (time.perf_counter() - started) * 1000
+    db.close()
+
+    print(f"{args.volunteers + args.drivers} users, {result['weeks']} weeks, {result['created']} assignments")
+    print(f"dry run median {statistics.median(timings):.1f} ms, with bulk insert and commit {committed:.1f} ms")
+    print(f"assignments per user: min {result['min_per_user']}, max {result['max_per_user']}, "
+          f"unfilled slots {sum(entry['missing'] for entry in result['unfilled'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volunteers", type=int, default=500)
+    parser.add_argument("--drivers", type=int, default=100)
+    parser.add_argument("--packers", type=int, default=120, help="packers needed per week")
+    parser.add_argument("--per-week-drivers", type=int, default=25, help="drivers needed per week")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/scheduler.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
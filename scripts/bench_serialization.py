@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare per-row serialization cost for every schema in backend/schemas.py.
+
+For each Pydantic model, builds --rows synthetic rows from its field types and
+times three ways of turning them into a JSON body:
+
+    pydantic   validate from attributes, dump to JSON-able data, json.dumps
+               (what a response_model route does with ORM objects)
+    fast       column tuples -> dicts -> backend.serialization.dumps
+               (orjson when installed)
+    stdlib     column tuples -> dicts -> json.dumps with a default handler
+
+Prints microseconds per row and the speedup of the fast path.
+
+Usage:
+    python scripts/bench_serialization.py --rows 1000
+"""
+import argparse
+import enum
+import inspect
+import json
+import os
+import sys
+import time
+import typing
+from datetime import date, datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel, TypeAdapter
+
+from backend import schemas, serialization
+
+NOW = datetime(2026, 1, 5, 9, 30, 15, 123456)
+
+
+def sample(annotation):
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        return sample(next(arg for arg in args if arg is not type(None)))
+    if origin in (list, typing.List):
+        return [sample(args[0])] if args else []
+    if origin in (dict, typing.Dict):
+        return {sample(args[0]): sample(args[1])} if args else {}
+    if inspect.isclass(annotation):
+        if issubclass(annotation, BaseModel):
+            return SimpleNamespace(**{name: sample(field.annotation) for name, field in annotation.model_fields.items()})
+        if issubclass(annotation, enum.Enum):
+            return next(iter(annotation))
+        if issubclass(annotation, bool):
+            return True
+        if issubclass(annotation, int):
+            return 42
+        if issubclass(annotation, float):
+            return 12.5
+        if issubclass(annotation, datetime):
+            return NOW
+        if issubclass(annotation, date):
+            return NOW.date()
+    # str, EmailStr and anything else string-like
+    return "storehouse@example.com"
+
+
+def plain(value):
+    if isinstance(value, SimpleNamespace):
+        return {key: plain(item) for key, item in vars(value).items()}
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    return value
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench(schema, rows, repeat):
+    names = tuple(schema.model_fields)
+    template = {name: sample(field.annotation) for name, field in schema.model_fields.items()}
+    objects = [SimpleNamespace(**template) for _ in range(rows)]
+    tuples = [tuple(plain(template[name]) for name in names) for _ in range(rows)]
+    adapter = TypeAdapter(typing.List[schema])
+
+    def pydantic_path():
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode="json"), separators=(",", ":")).encode()
+
+    def fast_path():
+        return serialization.dumps([dict(zip(names, row)) for row in tuples])
+
+    def stdlib_path():
+        return json.dumps([dict(zip(names, row)) for row in tuples], default=serialization._default,
+                          separators=(",", ":")).encode()
+
+    pydantic_path()  # fail early if the sample does not validate
+    return [timed(path, repeat) / rows * 1e6 for path in (pydantic_path, fast_path, stdlib_path)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5, help="best of N runs")
+    args = parser.parse_args()
+
+    models = [
+        model for _, model in inspect.getmembers(schemas, inspect.isclass)
+        if issubclass(model, BaseModel) and model is not BaseModel and model.__module__ == schemas.__name__
+    ]
+    encoder = "orjson" if serialization.orjson is not None else "json (orjson not installed)"
+    print(f"fast path encoder: {encoder}; microseconds per row, best of {args.repeat}")
+    print(f"{'schema':<28} {'fields':>6} {'pydantic':>9} {'fast':>7} {'stdlib':>7} {'speedup':>8}")
+    for model in sorted(models, key=lambda model: model.__name__):
+        try:
+            pydantic_us, fast_us, stdlib_us = bench(model, args.rows, args.repeat)
+        except Exception as exc:
+            print(f"{model.__name__:<28} skipped: {exc.__class__.__name__}")
+            continue
+        print(f"{model.__name__:<28} {len(model.model_fields):>6} {pydantic_us:>9.2f} {fast_us:>7.2f} "
+              f"{stdlib_us:>7.2f} {pydantic_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare boxing a packing session with POST /packing-sessions/{id}/boxes
+against the client-side loop it replaces: one POST /food-boxes/ per family.
+
+Seeds --agencies agencies with --families families each, a confirmed weekly
+requirement per agency and a packing list of --items items into a throwaway
+SQLite database. Both runs include the stock ledger; the batch run also
+streams the CSV manifest.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python scripts/bench_session_boxes.py --agencies 40 --families 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WEEK = datetime(2026, 1, 5)
+
+
+def seed(engine, args):
+    from sqlalchemy import insert
+    from backend import models
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"email": "boxes@storehouse.com", "hashed_password": "x", "full_name": "Boxes", "role": models.UserRole.COORDINATOR}])
+        conn.execute(insert(models.Item), [{"name": f"Item {n}", "category": "food", "unit": "kg"} for n in range(args.items)])
+        conn.execute(insert(models.InventoryItem), [{"item_id": n + 1, "quantity": 1e6, "location": "A"} for n in range(args.items)])
+        conn.execute(insert(models.Agency), [
+            {"name": f"Agency {n}", "contact_person": "c", "email": f"agency{n}@storehouse.com"} for n in range(args.agencies)
+        ])
+        conn.execute(insert(models.Family), [
+            {"agency_id": agency + 1, "family_name": f"Family {family}", "contact_person": "c", "family_size": 3}
+            for agency in range(args.agencies) for family in range(args.families)
+        ])
+        conn.execute(insert(models.WeeklyRequirement), [
+            {"agency_id": agency + 1, "week_start": WEEK, "week_end": WEEK + timedelta(days=6),
+             "total_families": args.families, "total_boxes": args.families, "status": "confirmed"}
+            for agency in range(args.agencies)
+        ])
+        conn.execute(insert(models.PackingList), [
+            {"week_start": WEEK, "week_end": WEEK + timedelta(days=6), "total_boxes": args.agencies * args.families}
+        ])
+        conn.execute(insert(models.PackingListItem), [
+            {"packing_list_id": 1, "item_id": n + 1, "quantity_per_box": 1, "total_quantity_needed": args.agencies * args.families}
+            for n in range(args.items)
+        ])
+        conn.execute(insert(models.PackingSession), [
+            {"packing_list_id": 1, "scheduled_date": WEEK + timedelta(days=1)} for _ in range(2)
+        ])
+    from backend import stock
+    from backend.database import SessionLocal
+    db = SessionLocal()
+    stock.refresh_levels(db)
+    db.commit()
+    db.close()
+
+
+def run(args):
+    from fastapi.testclient import TestClient
+    from backend.auth import create_access_token
+    from backend.database import engine
+    from backend.main import app
+    from backend.migrations import upgrade
+
+    upgrade(engine)
+    seed(engine, args)
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': 'boxes@storehouse.com'})}"
+    families = args.agencies * args.families
+
+    started = time.perf_counter()
+    for family_id in range(1, families + 1):
+        client.post("/food-boxes/", json={"family_id": family_id, "packing_session_id": 1, "box_number": str(family_id)})
+    loop_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = client.post("/packing-sessions/2/boxes")
+    batch_s = time.perf_counter() - started
+    print(f"{families} families, {args.items} items per box")
+    print(f"one POST /food-boxes/ per family:   {loop_s:6.2f} s")
+    print(f"POST /packing-sessions/{{id}}/boxes:  {batch_s:6.2f} s "
+          f"({response.headers['x-boxes-created']} boxes, {len(response.content)} byte manifest)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agencies", type=int, default=40)
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--items", type=int, default=15)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/boxes.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
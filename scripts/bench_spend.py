@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compare the monthly spend report served from order_spend_summary with the
+same report aggregated from orders and order_items, and time the upkeep
+added to order item writes.
+
+Seeds --orders orders across --suppliers suppliers and 24 months, with
+--lines order items each, into a throwaway SQLite database, then builds the
+summary the way migration 7 does.
+
+Usage:
+    python scripts/bench_spend.py --orders 20000 --lines 10
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ORDER_TYPES = ("weekly", "monthly", "quarterly", "hygiene", "special")
+
+
+def seed(engine, args):
+    from sqlalchemy import insert
+    from backend import models
+
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"email": "spend@storehouse.com", "hashed_password": "x", "full_name": "Spend", "role": models.UserRole.COORDINATOR}])
+        conn.execute(insert(models.Item), [{"name": f"Item {n}", "category": "food", "unit": "kg"} for n in range(200)])
+        conn.execute(insert(models.Order), [
+            {"order_type": rng.choice(ORDER_TYPES), "supplier": f"Supplier {rng.randrange(args.suppliers)}",
+             "order_date": datetime(2025, 1, 1) + timedelta(days=rng.randrange(730)), "created_by": 1,
+             "status": models.OrderStatus.CANCELLED if rng.random() < 0.05 else models.OrderStatus.DELIVERED}
+            for _ in range(args.orders)
+        ])
+        for start in range(0, args.orders, 5000):
+            conn.execute(insert(models.OrderItem), [
+                {"order_id": order_id + 1, "item_id": rng.randrange(1, 201), "quantity": rng.randrange(1, 50),
+                 "unit_price": round(rng.uniform(0.2, 9.0), 2)}
+                for order_id in range(start, min(start + 5000, args.orders)) for _ in range(args.lines)
+            ])
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(timings)
+
+
+def run(args):
+    from sqlalchemy import func, select
+    from backend import models, spend
+    from backend.database import SessionLocal, engine
+    from backend.migrations import upgrade
+
+    upgrade(engine)
+    seed(engine, args)
+    db = SessionLocal()
+    started = time.perf_counter()
+    spend.order_items_changed(db, db.execute(select(models.OrderItem.id)).scalars().all())
+    spend.refresh_spend(db)
+    db.commit()
+    print(f"{args.orders} orders, {args.orders * args.lines} lines; initial build {time.perf_counter() - started:.1f} s")
+
+    order, line = models.Order, models.OrderItem
+    month = func.strftime("%Y-%m", order.order_date)
+    aggregated = (
+        select(order.supplier, order.order_type, month, func.count(func.distinct(order.id)), func.sum(line.total_price))
+        .join(line, line.order_id == order.id)
+        .where(order.status != models.OrderStatus.CANCELLED)
+        .group_by(order.supplier, order.order_type, month)
+    )
+    summary = models.OrderSpendSummary
+    rows, scan_ms = timed(lambda: db.execute(aggregated).all(), args.repeat)
+    summary_rows, summary_ms = timed(
+        lambda: db.execute(select(summary).order_by(summary.month_start, summary.supplier, summary.order_type)).all(),
+        args.repeat,
+    )
+    print(f"spend report from order_items: {scan_ms:8.1f} ms ({len(rows)} rows)")
+    print(f"spend report from summary:     {summary_ms:8.1f} ms ({len(summary_rows)} rows)")
+
+    rng = random.Random(3)
+    for upkeep in (False, True):
+        timings = []
+        for _ in range(args.repeat * 10):
+            started = time.perf_counter()
+            item = models.OrderItem(order_id=rng.randrange(1, args.orders + 1), item_id=1, quantity=2, unit_price=1.25)
+            db.add(item)
+            db.flush()
+            if upkeep:
+                spend.order_items_changed(db, [item.id])
+            db.commit()
+            timings.append((time.perf_counter() - started) * 1000)
+        label = "with totals and summary upkeep" if upkeep else "without upkeep"
+        print(f"order item insert {label}: median {statistics.median(timings):.2f} ms")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--suppliers", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/spend.db"
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
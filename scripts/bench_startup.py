@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Track API startup time from process launch to the first served request.
+
+Each run starts a fresh interpreter against a throwaway SQLite database that
+is migrated and seeded beforehand, and times four phases:
+
+    launch         interpreter start until backend.main begins importing
+    import         importing backend.main
+    startup        the lifespan hook (migrations check, pool and cache warm-up)
+    first_request  an authenticated GET /items/
+
+Results are appended to --history (CSV; .bench/startup_history.csv by
+default, which git ignores) so changes can be compared across commits; the
+previous median for the same settings is printed for reference.
+
+Usage:
+    python scripts/bench_startup.py --runs 5
+    python scripts/bench_startup.py --runs 5 --no-warm-up
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+PHASES = ("launch", "import", "startup", "first_request", "total")
+EMAIL = "startup@storehouse.com"
+
+
+def setup_child():
+    from backend.database import SessionLocal, engine
+    from backend.migrations import upgrade
+    from backend.models import User, UserRole
+
+    upgrade(engine)
+    db = SessionLocal()
+    db.add(User(email=EMAIL, hashed_password="x", full_name="Startup", role=UserRole.COORDINATOR))
+    db.commit()
+    db.close()
+
+
+def measure_child(launched):
+    started = time.time()
+    from backend.main import app
+    imported = time.time()
+
+    from fastapi.testclient import TestClient
+    from backend.auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': EMAIL})}"}
+    with TestClient(app) as client:
+        ready = time.time()
+        response = client.get("/items/", headers=headers)
+        served = time.time()
+    response.raise_for_status()
+
+    print(json.dumps({
+        "launch": started - launched,
+        "import": imported - started,
+        "startup": ready - imported,
+        "first_request": served - ready,
+        "total": served - launched,
+    }))
+
+
+def child(mode, env):
+    args = [sys.executable, os.path.abspath(__file__), "--child", mode, "--launched", str(time.time())]
+    output = subprocess.run(args, env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1]) if mode == "measure" else None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def previous_median(path, warm_up):
+    if not os.path.exists(path):
+        return None
+    with open(path, newline="") as f:
+        rows = [row for row in csv.DictReader(f) if row["warm_up"] == str(warm_up)]
+    if not rows:
+        return None
+    last_batch = [row for row in rows if row["recorded_at"] == rows[-1]["recorded_at"]]
+    return statistics.median(float(row["total"]) for row in last_batch), last_batch[0]["commit"]
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/startup.db",
+                   WARM_UP="true" if args.warm_up else "false")
+        child("setup", env)
+        results = [child("measure", env) for _ in range(args.runs)]
+
+    previous = previous_median(args.history, args.warm_up)
+    recorded_at = datetime.utcnow().isoformat(timespec="seconds")
+    commit = git_commit()
+    new_file = not os.path.exists(args.history)
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["recorded_at", "commit", "python", "warm_up", "run", *PHASES])
+        for n, result in enumerate(results, 1):
+            writer.writerow([recorded_at, commit, platform.python_version(), args.warm_up, n,
+                             *(f"{result[phase]:.4f}" for phase in PHASES)])
+
+    print(f"{'phase':<14} {'median ms':>10} {'max ms':>10}")
+    for phase in PHASES:
+        values = [result[phase] * 1000 for result in results]
+        print(f"{phase:<14} {statistics.median(values):>10.1f} {max(values):>10.1f}")
+    if previous:
+        print(f"previous median total: {previous[0] * 1000:.1f}ms (commit {previous[1]})")
+    print(f"appended {len(results)} runs to {args.history}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--history", default=os.path.join(ROOT, ".bench", "startup_history.csv"))
+    parser.add_argument("--no-warm-up", dest="warm_up", action="store_false")
+    parser.add_argument("--child", choices=("setup", "measure"), help=argparse.SUPPRESS)
+    parser.add_argument("--launched", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "setup":
+        setup_child()
+    elif args.child == "measure":
+        measure_child(args.launched)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
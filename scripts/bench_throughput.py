@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measure request throughput and latency of a running API server.
+
+Opens --concurrency keep-alive connections and requests --path for
+--duration seconds, then prints requests/second and latency percentiles.
+Used to compare the development and production profiles of run_backend.py.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python scripts/bench_throughput.py --url http://localhost:8001 --path /items/ \
+        --email admin@storehouse.com --password admin123
+"""
+import argparse
+import asyncio
+import time
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(args):
+    import httpx
+
+    headers = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        if args.email:
+            response = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+            response.raise_for_status()
+            headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(args.path, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{len(latencies) / elapsed:.0f} req/s  errors={errors}  "
+          f"p50={percentile(latencies, 50) * 1000:.1f}ms  "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Check that the stock ledger and stock levels stay in step.
+
+Runs each scenario in-process against a throwaway SQLite database and checks
+the resulting batches, movements and item_stock_levels. A failed check
+prints FAIL.
+
+Exits non-zero if any check fails.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python scripts/check_ledger.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WEEK = datetime(2026, 1, 5)
+
+
+class Checker:
+    def __init__(self, client):
+        self.client = client
+        self.failures = 0
+
+    def expect(self, name, actual, expected):
+        if actual == expected:
+            print(f"ok   {name}")
+        else:
+            self.failures += 1
+            print(f"FAIL {name}: expected {expected!r}, got {actual!r}")
+
+    def post(self, path, **kwargs):
+        response = self.client.post(path, **kwargs)
+        response.raise_for_status()
+        return response.json() if "json" in response.headers.get("content-type", "") else response
+
+    def level(self, item_id):
+        levels = {level["item_id"]: level for level in self.client.get("/inventory/levels").json()}
+        return levels[item_id]["total_quantity"] if item_id in levels else 0.0
+
+    def movements(self, **params):
+        return self.client.get("/inventory/movements", params={"limit": 1000, **params}).json()
+
+    def batches(self, item_id):
+        return {batch["id"]: batch for batch in self.client.get("/inventory/").json() if batch["item_id"] == item_id}
+
+    def ledger_matches_level(self, name, item_id):
+        movements = self.movements(item_id=item_id)
+        self.expect(f"{name}: movements add up to the stock level", round(sum(m["quantity_delta"] for m in movements), 6), round(self.level(item_id), 6))
+
+
+def packing_setup(check, item_id, families):
+    agency = check.post("/agencies/", json={"name": f"Agency for item {item_id}", "contact_person": "c", "email": f"agency{item_id}@storehouse.com"})["id"]
+    for n in range(families):
+        check.post("/families/", json={"agency_id": agency, "family_name": f"Family {n}", "contact_person": "c"})
+    packing_list = check.post("/packing-lists/", json={
+        "week_start": WEEK.isoformat(), "week_end": (WEEK + timedelta(days=6)).isoformat(), "total_boxes": families,
+    })["id"]
+    check.post("/packing-list-items/", json={
+        "packing_list_id": packing_list, "item_id": item_id, "quantity_per_box": 2, "total_quantity_needed": 2 * families,
+    })
+    session = check.post("/packing-sessions/", json={"packing_list_id": packing_list, "scheduled_date": (WEEK + timedelta(days=1)).isoformat()})["id"]
+    return agency, session
+
+
+def check_only_expired_stock(check):
+    # Packing an item whose only batch has expired leaves that batch alone and
+    # records the shortfall against a new undated batch.
+    name = "only expired stock"
+    item = check.post("/items/", json={"name": "Expired only", "category": "food", "unit": "tin"})["id"]
+    expired = check.post("/inventory/", json={
+        "item_id": item, "quantity": 10, "location": "A", "expiry_date": (datetime.utcnow() - timedelta(days=3)).isoformat(),
+    })["id"]
+    agency, session = packing_setup(check, item, 3)
+    check.post(f"/packing-sessions/{session}/boxes", json={"agency_ids": [agency]})
+
+    batches = check.batches(item)
+    check.expect(f"{name}: expired batch untouched", batches[expired]["quantity"], 10.0)
+    check.expect(f"{name}: no movements against the expired batch", [
+        m for m in check.movements(item_id=item) if m["inventory_item_id"] == expired and m["reason"] == "packed"
+    ], [])
+    shortfall = [batch for batch_id, batch in batches.items() if batch_id != expired]
+    check.expect(f"{name}: shortfall on one new undated batch", [(b["quantity"], b["expiry_date"]) for b in shortfall], [(-6.0, None)])
+    check.ledger_matches_level(name, item)
+
+
+def check_generated_shortfall(check):
+    # A generated packing list counts only in-date stock as available, like
+    # the pick list it leads to.
+    name = "generated list shortfall"
+    client = check.client
+    item = check.post("/items/", json={"name": "Generated beans", "category": "food", "unit": "tin"})["id"]
+    for quantity, expiry in ((10, datetime.utcnow() - timedelta(days=3)), (4, datetime.utcnow() + timedelta(days=30))):
+        check.post("/inventory/", json={"item_id": item, "quantity": quantity, "location": "A", "expiry_date": expiry.isoformat()})
+    agency = check.post("/agencies/", json={"name": "Generated agency", "contact_person": "c", "email": "generated@storehouse.com"})["id"]
+    week = WEEK + timedelta(weeks=1)
+    requirement = check.post("/weekly-requirements/", json={
+        "agency_id": agency, "week_start": week.isoformat(), "week_end": (week + timedelta(days=6)).isoformat(),
+        "total_families": 3, "total_boxes": 3,
+    })["id"]
+    client.put(f"/weekly-requirements/{requirement}", json={"status": "confirmed"}).raise_for_status()
+    generated = check.post("/packing-lists/generate", json={
+        "week_start": week.isoformat(), "week_end": (week + timedelta(days=6)).isoformat(),
+        "items": [{"item_id": item, "quantity_per_box": 2}], "dry_run": True,
+    })
+    line = generated["items"][0]
+    check.expect(f"{name}: expired stock not available", (line["available_quantity"], line["shortfall"]), (4.0, 2.0))
+
+def check_delivered_order_lines(check):
+    # Lines added to, changed on or removed from a delivered order move stock,
+    # and reversing the delivery takes all of it back.
+    name = "delivered order lines"
+    client = check.client
+    rice = check.post("/items/", json={"name": "Order rice", "category": "food", "unit": "kg"})["id"]
+    beans = check.post("/items/", json={"name": "Order beans", "category": "food", "unit": "tin"})["id"]
+    order = check.post("/orders/", json={"order_type": "weekly", "supplier": "S", "order_date": WEEK.isoformat(), "created_by": 1})["id"]
+    line = check.post("/order-items/", json={"order_id": order, "item_id": rice, "quantity": 10})["id"]
+    client.put(f"/orders/{order}", json={"status": "delivered"}).raise_for_status()
+    check.expect(f"{name}: delivery", check.level(rice), 10.0)
+
+    added = check.post("/order-items/", json={"order_id": order, "item_id": beans, "quantity": 5})["id"]
+    check.expect(f"{name}: line added", check.level(beans), 5.0)
+    client.put(f"/order-items/{line}", json={"quantity": 7}).raise_for_status()
+    check.expect(f"{name}: line reduced", check.level(rice), 7.0)
+    check.post("/order-items/bulk", json=[{"id": line, "quantity": 12}, {"order_id": order, "item_id": rice, "quantity": 1}])
+    check.expect(f"{name}: bulk update and insert", check.level(rice), 13.0)
+    client.delete(f"/order-items/{added}").raise_for_status()
+    check.expect(f"{name}: line deleted", check.level(beans), 0.0)
+
+    client.put(f"/orders/{order}", json={"status": "confirmed"}).raise_for_status()
+    check.expect(f"{name}: reversal takes everything back", (check.level(rice), check.level(beans)), (0.0, 0.0))
+    client.put(f"/orders/{order}", json={"status": "delivered"}).raise_for_status()
+    check.expect(f"{name}: redelivery", check.level(rice), 13.0)
+    check.ledger_matches_level(f"{name} (rice)", rice)
+    check.ledger_matches_level(f"{name} (beans)", beans)
+
+
+def run():
+    from fastapi.testclient import TestClient
+    from backend.auth import create_access_token
+    from backend.database import SessionLocal, engine
+    from backend.main import app
+    from backend.migrations import upgrade
+    from backend.models import User, UserRole
+
+    upgrade(engine)
+    db = SessionLocal()
+    db.add(User(email="ledger@storehouse.com", hashed_password="x", full_name="Ledger", role=UserRole.COORDINATOR))
+    db.commit()
+    db.close()
+
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': 'ledger@storehouse.com'})}"
+    check = Checker(client)
+    for scenario in (check_only_expired_stock, check_generated_shortfall, check_delivered_order_lines):
+        scenario(check)
+    print(f"{check.failures} ledger checks failed")
+    return 1 if check.failures else 0
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/ledger.db"
+        return run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
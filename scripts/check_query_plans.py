@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Check that every filtered list endpoint is served by an index.
+
+Calls each GET list endpoint in-process against a throwaway SQLite database,
+once per filter parameter and once with all filters combined. Every SELECT it
+runs is captured and passed through EXPLAIN QUERY PLAN. A full table scan on a
+query with a WHERE clause is reported as a failure. An unfiltered walk of the
+primary key is fine.
+
+Exits non-zero if any endpoint scans a table.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python scripts/check_query_plans.py
+"""
+import inspect
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_VALUES = {
+    "status": "pending",
+    "role": "coordinator",
+    "category": "food",
+    "order_type": "weekly",
+    "rota_type": "packing",
+    "recipient_type": "agency",
+    "communication_type": "email",
+}
+PAGING_PARAMS = {"skip", "limit", "cursor", "fields", "response", "db", "current_user", "validators"}
+
+
+def filter_params(endpoint):
+    return [name for name in inspect.signature(endpoint).parameters if name not in PAGING_PARAMS]
+
+
+def run():
+    from fastapi.routing import APIRoute
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from backend.auth import create_access_token
+    from backend.database import SessionLocal, engine
+    from backend.main import app
+    from backend.migrations import upgrade
+    from backend.models import User, UserRole
+
+    upgrade(engine)
+    db = SessionLocal()
+    db.add(User(email="plans@storehouse.com", hashed_password="x", full_name="Plans", role=UserRole.COORDINATOR))
+    db.commit()
+    db.close()
+
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # Skip the authentication lookup, which goes through the unique email index.
+        if statement.lstrip().upper().startswith("SELECT") and "users.email = " not in statement:
+            captured.append((statement, parameters))
+
+    client = TestClient(app, raise_server_exceptions=False)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': 'plans@storehouse.com'})}"
+
+    failures = 0
+    routes = [
+        route for route in app.routes
+        if isinstance(route, APIRoute) and "GET" in route.methods and "{" not in route.path
+    ]
+    for route in routes:
+        params = filter_params(route.endpoint)
+        combos = [{name: SAMPLE_VALUES.get(name, 1)} for name in params]
+        if len(params) > 1:
+            combos.append({name: SAMPLE_VALUES.get(name, 1) for name in params})
+        for combo in combos:
+            captured.clear()
+            response = client.get(route.path, params=combo)
+            if response.status_code != 200:
+                print(f"SKIP {route.path} {combo}: HTTP {response.status_code}")
+                continue
+            with engine.connect() as conn:
+                for statement, parameters in captured:
+                    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                    details = [row[-1] for row in plan]
+                    scans = [d for d in details if re.match(r"SCAN \w+$", d)]
+                    if scans and re.search(r"\bWHERE\b", statement):
+                        failures += 1
+                        print(f"FAIL {route.path} {combo}: {'; '.join(details)}")
+                    else:
+                        print(f"ok   {route.path} {combo}: {'; '.join(details)}")
+
+    print(f"{failures} endpoint queries fall back to a table scan")
+    return 1 if failures else 0
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+        return run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
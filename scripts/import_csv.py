@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Import families or items from a CSV file
+
+The header row names the columns (the same fields as POST /families/ or
+POST /items/). Rows that fail validation or already exist are reported and
+skipped; everything else is inserted in chunks.
+
+Usage:
+    python scripts/import_csv.py families families.csv
+    python scripts/import_csv.py items items.csv --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from backend.database import SessionLocal, engine
+from backend.imports import IMPORTS, import_csv
+from backend.migrations import upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", choices=sorted(IMPORTS))
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="validate and report without inserting")
+    parser.add_argument("--max-errors", type=int, default=20, help="row errors to print")
+    args = parser.parse_args()
+
+    upgrade(engine)
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            result = import_csv(db, args.dataset, stream, dry_run=args.dry_run)
+    except HTTPException as exc:
+        print(f"Import failed: {exc.detail}")
+        return 1
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    verb = "would create" if result["dry_run"] else "created"
+    print(f"{result['rows']} rows in {elapsed:.2f}s: {verb} {result['created']}, "
+          f"{result['duplicates']} duplicates, {result['failed']} failed")
+    for error in result["errors"][:args.max_errors]:
+        print(f"  line {error['line']}: {error['error']}")
+    if len(result["errors"]) > args.max_errors:
+        print(f"  ... {len(result['errors']) - args.max_errors} more")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
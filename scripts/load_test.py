@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Load test: latency of fast requests while another request runs a long query.
+
+Runs the API in-process against a throwaway SQLite database. Every query that
+touches packing_lists is slowed down by --slow-seconds, so hitting
+/packing-lists/ simulates a long-running report. Meanwhile --clients
+concurrent clients hammer /items/ and the script reports p50/p95/p99 latency.
+
+If handlers block the event loop, the p99 of /items/ climbs to roughly the
+slow query time. With handlers running in the threadpool it stays flat.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python scripts/load_test.py --clients 200 --requests 10 --slow-seconds 2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import event
+    from backend.database import SessionLocal, engine
+    from backend.main import app
+    from backend.models import Base, User, UserRole, Item
+    from backend.auth import create_access_token
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(User(email="load@test.local", hashed_password="x", full_name="Load Test", role=UserRole.COORDINATOR))
+    db.add_all([Item(name=f"Item {i}", category="food", unit="kg") for i in range(50)])
+    db.commit()
+    db.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow_down(conn, cursor, statement, parameters, context, executemany):
+        if "packing_lists" in statement:
+            time.sleep(args.slow_seconds)
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'load@test.local'})}"}
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+
+            async def slow_client():
+                for _ in range(args.slow_requests):
+                    await client.get("/packing-lists/")
+
+            async def fast_client():
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    response = await client.get("/items/")
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(slow_client(), *(fast_client() for _ in range(args.clients)))
+            elapsed = time.perf_counter() - started
+
+    print(f"clients={args.clients} requests={len(latencies)} elapsed={elapsed:.2f}s")
+    print(f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+          f"max={max(latencies) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--slow-seconds", type=float, default=2.0)
+    parser.add_argument("--slow-requests", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'load_test.db')}"
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
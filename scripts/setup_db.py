@@ -7,14 +7,15 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.database import SessionLocal, engine
-from backend.models import Base, User, UserRole, Agency, Item, InventoryItem
+from backend.models import User, UserRole, Agency, Item, InventoryItem
+from backend.migrations import upgrade
 from backend.auth import get_password_hash
 from datetime import datetime, timedelta
 
 def create_initial_data():
     """Create initial data for the application"""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
+    # Create or upgrade tables
+    upgrade(engine)
     
     db = SessionLocal()
     
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Reproduce SQLite lock contention between packing writers and dashboard readers.
+
+Runs --writers threads that insert food boxes in short transactions while
+--readers threads run a slow aggregate over the same table, first against an
+engine configured like the original database.py (rollback journal, default
+pool, no pragmas) and then against the tuned engine from backend.database.
+Prints committed writes and reads, "database is locked" errors on each side
+and write latency.
+Set SQLITE_BUSY_TIMEOUT_MS to change the busy timeout used by both engines.
+
+Usage:
+    python scripts/sqlite_contention.py --writers 8 --readers 4 --duration 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from backend import models
+from backend.database import SQLITE_BUSY_TIMEOUT_MS, Base, create_database_engine
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.FoodBox), [
+            {"box_number": f"SEED-{n}", "family_id": n % 500 + 1, "packing_session_id": 1}
+            for n in range(rows)
+        ])
+
+
+def run(engine, args):
+    stop = time.perf_counter() + args.duration
+    latencies, reads = [], [0]
+    errors = {"writer": 0, "reader": 0}
+    lock = threading.Lock()
+
+    def locked(kind, exc):
+        if "locked" not in str(exc):
+            raise exc
+        with lock:
+            errors[kind] += 1
+
+    def writer(worker):
+        n = 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(models.FoodBox).values(
+                        box_number=f"W{worker}-{n}", family_id=1, packing_session_id=1,
+                    ))
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except OperationalError as exc:
+                locked("writer", exc)
+            n += 1
+
+    def reader():
+        # A self-join keeps the read transaction (and its shared lock) open long
+        # enough to collide with writers, like a heavy report query.
+        a = models.FoodBox.__table__.alias()
+        b = models.FoodBox.__table__.alias()
+        query = select(func.count()).select_from(a.join(b, a.c.family_id == b.c.family_id))
+        while time.perf_counter() < stop:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(query).scalar()
+            except OperationalError as exc:
+                locked("reader", exc)
+                continue
+            with lock:
+                reads[0] += 1
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "writes": len(latencies),
+        "write_locked": errors["writer"],
+        "read_locked": errors["reader"],
+        "reads": reads[0],
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rows", type=int, default=20000, help="food boxes seeded before the run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_url = f"sqlite:///{tmp}/baseline.db"
+        # Same busy timeout on both sides so only journal mode, pragmas and
+        # pooling differ.
+        baseline = create_engine(baseline_url, connect_args={
+            "check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        })
+        seed(baseline, args.rows)
+
+        tuned = create_database_engine(f"sqlite:///{tmp}/tuned.db")
+        seed(tuned, args.rows)
+
+        for name, engine in (("baseline", baseline), ("tuned", tuned)):
+            result = run(engine, args)
+            print(f"{name:<9} writes={result['writes']:<6} locked={result['write_locked']:<4} "
+                  f"reads={result['reads']:<4} locked={result['read_locked']:<4} p50={result['p50']:.1f}ms p99={result['p99']:.1f}ms")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -46,20 +46,16 @@ const Dashboard: React.FC = () => {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const [agenciesRes, familiesRes, itemsRes, packingListsRes] = await Promise.all([
-          api.get('/agencies/'),
-          api.get('/families/'),
-          api.get('/items/'),
-          api.get('/packing-lists/'),
-        ]);
+        const { data: summary } = await api.get('/dashboard/summary');
+        const families: Record<string, number> = summary.families_by_status;
 
         setStats({
-          totalAgencies: agenciesRes.data.length,
-          totalFamilies: familiesRes.data.length,
-          totalItems: itemsRes.data.length,
-          pendingPackingLists: packingListsRes.data.filter((list: any) => list.status === 'scheduled').length,
-          upcomingSessions: 0, // TODO: Implement when packing sessions are added
-          activeVolunteers: 0, // TODO: Implement when volunteers are added
+          totalAgencies: summary.total_agencies,
+          totalFamilies: Object.values(families).reduce((total, count) => total + count, 0),
+          totalItems: summary.total_items,
+          pendingPackingLists: summary.packing_lists_by_status.scheduled,
+          upcomingSessions: summary.upcoming_sessions,
+          activeVolunteers: summary.active_volunteers,
         });
       } catch (error) {
         console.error('Error fetching dashboard stats:', error);